@@ -0,0 +1,67 @@
+"""This module provides helpers shared by collector benchmarks."""
+
+import os
+import sys
+import json
+import time
+import platform
+import subprocess
+
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
+COLLECTOR_DIR = os.path.join(ROOT_DIR, "collector")
+
+
+def add_collector_path():
+    """Make collector app package importable from benchmarks."""
+    if COLLECTOR_DIR not in sys.path:
+        sys.path.insert(0, COLLECTOR_DIR)
+
+
+def percentile(values, percent):
+    """Return percentile of values using nearest-rank method."""
+    if not values:
+        return None
+
+    ordered = sorted(values)
+    rank = max(int(round(percent / 100 * len(ordered))) - 1, 0)
+    return ordered[min(rank, len(ordered) - 1)]
+
+
+def summarize(latencies):
+    """Return latency summary in milliseconds."""
+    latencies = [latency * 1000 for latency in latencies]
+    return {
+        "count": len(latencies),
+        "mean": sum(latencies) / len(latencies) if latencies else None,
+        "p50": percentile(latencies, 50),
+        "p95": percentile(latencies, 95),
+        "p99": percentile(latencies, 99),
+        "max": max(latencies) if latencies else None
+    }
+
+
+def get_git_revision():
+    """Return current git commit hash or None outside of git checkout."""
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "HEAD"], cwd=ROOT_DIR, stderr=subprocess.DEVNULL
+        ).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def save_results(path, name, params, results):
+    """Write benchmark results to json file so they can be compared between commits."""
+    report = {
+        "benchmark": name,
+        "revision": get_git_revision(),
+        "timestamp": time.time(),
+        "python": platform.python_version(),
+        "params": params,
+        "results": results
+    }
+    with open(path, "w") as results_file:
+        json.dump(report, results_file, indent=2)
+
+    return report
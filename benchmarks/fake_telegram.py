@@ -0,0 +1,69 @@
+"""This module provides fake telegram bot API server for local runs."""
+
+import time
+import argparse
+
+from aiohttp import web
+
+
+class FakeTelegram:
+    """Class that accepts sendMessage calls and records their delivery time."""
+
+    def __init__(self, throttle_every=0, retry_after=1):
+        """Set how often requests are answered with 429 (0 disables throttling)."""
+        self.throttle_every = throttle_every
+        self.retry_after = retry_after
+        self.requests = 0
+        self.messages = []
+
+    async def send_message(self, request):
+        """Record message or answer with too many requests error."""
+        self.requests += 1
+        if self.throttle_every and self.requests % self.throttle_every == 0:
+            return web.json_response({
+                "ok": False,
+                "error_code": 429,
+                "description": "Too Many Requests",
+                "parameters": {"retry_after": self.retry_after}
+            })
+
+        params = dict(request.query)
+        if request.body_exists:
+            params.update(await request.post())
+
+        self.messages.append({
+            "chat_id": params.get("chat_id"),
+            "text": params.get("text"),
+            "received_at": time.time()
+        })
+        return web.json_response({"ok": True, "result": {"message_id": len(self.messages)}})
+
+    async def stats(self, request):  # pylint: disable=unused-argument
+        """Return received messages."""
+        return web.json_response({"requests": self.requests, "messages": self.messages})
+
+    async def reset(self, request):  # pylint: disable=unused-argument
+        """Forget received messages."""
+        self.requests = 0
+        self.messages = []
+        return web.json_response({"ok": True})
+
+    def make_app(self):
+        """Return aiohttp application that serves fake bot API."""
+        app = web.Application()
+        app.router.add_route("*", "/bot{token}/sendMessage", self.send_message)
+        app.router.add_get("/stats", self.stats)
+        app.router.add_post("/reset", self.reset)
+        return app
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Run fake telegram bot API server.")
+    parser.add_argument("--host", default="localhost")
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--throttle-every", type=int, default=0, help="Answer each N-th request with 429.")
+    parser.add_argument("--retry-after", type=int, default=1, help="retry_after value of 429 responses.")
+    args = parser.parse_args()
+
+    fake_telegram = FakeTelegram(args.throttle_every, args.retry_after)
+    web.run_app(fake_telegram.make_app(), host=args.host, port=args.port)
@@ -0,0 +1,137 @@
+"""
+This module provides benchmark of collector launcher modes.
+
+collector/run.py is started as subprocess in single process mode and in prefork
+mode (optionally with uvloop), then routes that do not touch database (health
+check and monobank webhook confirmation with jwt decoding) are loaded by several
+client processes, so the client is not the bottleneck. Postgres and redis from the
+usual environment variables must be reachable since workers run startup hooks.
+
+Example:
+    python benchmarks/launcher.py --workers auto --clients 4 --requests 20000
+"""
+
+import os
+import sys
+import json
+import time
+import signal
+import asyncio
+import argparse
+import subprocess
+from multiprocessing import Pool
+
+import jwt
+from aiohttp import ClientSession, ClientError, TCPConnector
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir)))
+
+from benchmarks.common import COLLECTOR_DIR, save_results, summarize  # noqa: E402
+
+
+async def run_client(url, requests, concurrency):
+    """Send requests to url with limited concurrency and return latencies."""
+    latencies = []
+    counter = iter(range(requests))
+
+    async def worker(session):
+        for _ in counter:
+            started_at = time.perf_counter()
+            async with session.get(url) as response:
+                await response.read()
+            latencies.append(time.perf_counter() - started_at)
+
+    async with ClientSession(connector=TCPConnector(limit=concurrency)) as session:
+        await asyncio.gather(*(worker(session) for _ in range(concurrency)))
+
+    return latencies
+
+
+def run_client_process(params):
+    """Run client in separate process."""
+    return asyncio.run(run_client(*params))
+
+
+def run_load(url, args):
+    """Load url by client processes and return throughput with latency summary."""
+    params = [(url, args.requests // args.clients, args.concurrency)] * args.clients
+    with Pool(args.clients) as pool:
+        started_at = time.perf_counter()
+        latencies = [latency for result in pool.map(run_client_process, params) for latency in result]
+        duration = time.perf_counter() - started_at
+
+    return {"throughput": len(latencies) / duration, "latency": summarize(latencies)}
+
+
+async def wait_ready(url, timeout):
+    """Wait until collector health check reports it is ready."""
+    deadline = time.monotonic() + timeout
+    async with ClientSession() as session:
+        while time.monotonic() < deadline:
+            try:
+                async with session.get(url) as response:
+                    if response.status == 200:
+                        return
+            except ClientError:
+                pass
+            await asyncio.sleep(0.2)
+
+    raise TimeoutError(f"Collector is not ready after {timeout}s.")
+
+
+def run_mode(name, env, args):
+    """Start collector in launcher mode and measure every route."""
+    base_url = f"http://{args.host}:{args.port}"
+    token = jwt.encode({"user_id": 1}, os.environ["MONOBANK_WEBHOOK_SECRET"]).decode()
+    routes = {"health": "/health", "webhook_confirmation": f"/monobank/{token}"}
+
+    process_env = dict(os.environ, COLLECTOR_HOST=args.host, COLLECTOR_PORT=str(args.port), **env)
+    process = subprocess.Popen([sys.executable, "run.py"], cwd=COLLECTOR_DIR, env=process_env)
+    results = {}
+    try:
+        asyncio.run(wait_ready(f"{base_url}/health", args.startup_timeout))
+        # let every worker finish its warm-up
+        time.sleep(args.startup_delay)
+        for route, path in routes.items():
+            print(f"{name}: {route}", flush=True)
+            results[route] = run_load(f"{base_url}{path}", args)
+    finally:
+        process.send_signal(signal.SIGTERM)
+        process.wait(timeout=30)
+
+    return results
+
+
+def parse_args():
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description="Collector launcher modes benchmark.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=5013)
+    parser.add_argument("--workers", default="auto", help="Count of workers in prefork mode.")
+    parser.add_argument("--uvloop", action="store_true", help="Also measure prefork mode with uvloop.")
+    parser.add_argument("--clients", type=int, default=4, help="Count of client processes.")
+    parser.add_argument("--requests", type=int, default=20000)
+    parser.add_argument("--concurrency", type=int, default=32, help="Concurrent requests per client process.")
+    parser.add_argument("--startup-timeout", type=float, default=60)
+    parser.add_argument("--startup-delay", type=float, default=2)
+    parser.add_argument("--output", default="launcher-benchmark.json")
+    return parser.parse_args()
+
+
+def main(args):
+    """Run launcher benchmark and save results."""
+    modes = {
+        "single_process": {"COLLECTOR_WORKERS": "1", "COLLECTOR_UVLOOP": "false"},
+        "prefork": {"COLLECTOR_WORKERS": args.workers, "COLLECTOR_UVLOOP": "false"}
+    }
+    if args.uvloop:
+        modes["prefork_uvloop"] = {"COLLECTOR_WORKERS": args.workers, "COLLECTOR_UVLOOP": "true"}
+
+    results = {name: run_mode(name, env, args) for name, env in modes.items()}
+    params = {key: value for key, value in vars(args).items() if key != "output"}
+    report = save_results(args.output, "launcher", params, results)
+    print(json.dumps(report["results"], indent=2))
+
+
+if __name__ == '__main__':
+    main(parse_args())
@@ -0,0 +1,138 @@
+"""
+This module provides benchmark of collector middleware pipeline.
+
+Requests are sent through in-process aiohttp server, so the measured latency
+includes only routing, middlewares and trivial handlers. Both app-wide chain
+(every request binds lazy database connection and goes through body and error
+middlewares) and route-aware pipeline are measured on the same routes. Database
+from the usual environment variables must be reachable for database binding.
+
+Example:
+    python benchmarks/middleware.py --requests 20000 --concurrency 32
+"""
+
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+
+from aiohttp import ClientSession, TCPConnector, web
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir)))
+
+from benchmarks.common import add_collector_path, save_results, summarize  # noqa: E402
+
+add_collector_path()
+
+from app.db import db, get_database_dsn  # noqa: E402  pylint: disable=wrong-import-position
+from app.middlewares import (  # noqa: E402  pylint: disable=wrong-import-position
+    body_validator_middleware,
+    error_middleware,
+    pipeline_middleware,
+    route_options
+)
+
+
+ROUTES = ("/health", "/socket.io/")
+
+
+async def handle_error(request):  # pylint: disable=unused-argument
+    """Return trivial error response."""
+    return web.json_response({"success": False}, status=404)
+
+
+@route_options(errors=False)
+async def handle_health(request):  # pylint: disable=unused-argument
+    """Return trivial health response."""
+    return web.json_response({"success": True})
+
+
+async def handle_socket(request):  # pylint: disable=unused-argument
+    """Return trivial response for route without declared options like socketio one."""
+    return web.Response(text="ok")
+
+
+def make_app(pipeline):
+    """Return app with app-wide middleware chain or route-aware pipeline."""
+    error_handlers = {404: handle_error, 405: handle_error}
+    if pipeline:
+        middlewares = [pipeline_middleware(error_handlers)]
+    else:
+        middlewares = [db, body_validator_middleware, error_middleware(error_handlers)]
+
+    app = web.Application(middlewares=middlewares)
+    app.router.add_get("/health", handle_health)
+    app.router.add_get("/socket.io/", handle_socket)
+    return app
+
+
+async def run_load(url, requests, concurrency):
+    """Send requests to url with limited concurrency and return latencies."""
+    latencies = []
+    counter = iter(range(requests))
+
+    async def worker(session):
+        for _ in counter:
+            started_at = time.perf_counter()
+            async with session.get(url) as response:
+                await response.read()
+            latencies.append(time.perf_counter() - started_at)
+
+    async with ClientSession(connector=TCPConnector(limit=concurrency)) as session:
+        started_at = time.perf_counter()
+        await asyncio.gather(*(worker(session) for _ in range(concurrency)))
+        duration = time.perf_counter() - started_at
+
+    return {"throughput": requests / duration, "latency": summarize(latencies)}
+
+
+async def run_app(pipeline, args):
+    """Start app and measure every route."""
+    runner = web.AppRunner(make_app(pipeline))
+    await runner.setup()
+    await web.TCPSite(runner, args.host, args.port).start()
+
+    results = {}
+    try:
+        for route in ROUTES:
+            url = f"http://{args.host}:{args.port}{route}"
+            await run_load(url, args.warmup, args.concurrency)
+            results[route] = await run_load(url, args.requests, args.concurrency)
+    finally:
+        await runner.cleanup()
+
+    return results
+
+
+def parse_args():
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description="Collector middleware pipeline benchmark.")
+    parser.add_argument("--host", default="localhost")
+    parser.add_argument("--port", type=int, default=5012)
+    parser.add_argument("--requests", type=int, default=10000)
+    parser.add_argument("--warmup", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--output", default="middleware-benchmark.json")
+    return parser.parse_args()
+
+
+async def main(args):
+    """Run middleware benchmark and save results."""
+    await db.set_bind(get_database_dsn())
+    try:
+        results = {
+            "app_wide": await run_app(pipeline=False, args=args),
+            "pipeline": await run_app(pipeline=True, args=args)
+        }
+    finally:
+        await db.pop_bind().close()
+
+    params = {key: value for key, value in vars(args).items() if key != "output"}
+    report = save_results(args.output, "middleware", params, results)
+    print(json.dumps(report["results"], indent=2))
+
+
+if __name__ == '__main__':
+    asyncio.run(main(parse_args()))
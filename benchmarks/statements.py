@@ -0,0 +1,100 @@
+"""
+This module provides benchmark of hot sql statements.
+
+Every read statement is executed sequentially through gino (sqlalchemy
+compilation on every call) and directly by asyncpg with prepared statement
+cached per connection. Database from the usual environment variables must
+contain user passed with --user.
+
+Example:
+    python benchmarks/statements.py --user 1 --category 1 --iterations 5000
+"""
+
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+from datetime import datetime
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir)))
+
+from benchmarks.common import add_collector_path, save_results, summarize  # noqa: E402
+
+add_collector_path()
+
+from app import config  # noqa: E402  pylint: disable=wrong-import-position
+from app.db import db, get_database_dsn  # noqa: E402  pylint: disable=wrong-import-position
+from app.models.spending import CategorySpending  # noqa: E402  pylint: disable=wrong-import-position
+from app.models.user import User  # noqa: E402  pylint: disable=wrong-import-position
+
+
+async def run_statement(execute, iterations):
+    """Execute statement sequentially and return latencies."""
+    latencies = []
+    for _ in range(iterations):
+        started_at = time.perf_counter()
+        await execute()
+        latencies.append(time.perf_counter() - started_at)
+
+    return latencies
+
+
+async def run_path(prepared, args):
+    """Measure every statement on gino or prepared statement path."""
+    config.POSTGRES_PREPARED_STATEMENTS = prepared
+    month = datetime.now().date().replace(day=1)
+    statements = {
+        "select_user": lambda: User.SELECT_USER.one(user_id=args.user),
+        "select_limits": lambda: User.SELECT_LIMITS.all(user_id=args.user),
+        "select_spending": lambda: CategorySpending.SELECT_SPENDING.scalar(
+            user_id=args.user,
+            category_id=args.category,
+            month=month
+        )
+    }
+
+    results = {}
+    # hold single connection so both paths measure statements and not pool acquiring
+    async with db.acquire():
+        for name, execute in statements.items():
+            await run_statement(execute, args.warmup)
+            latencies = await run_statement(execute, args.iterations)
+            results[name] = {
+                "throughput": len(latencies) / sum(latencies),
+                "latency": summarize(latencies)
+            }
+
+    return results
+
+
+def parse_args():
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description="Collector hot sql statements benchmark.")
+    parser.add_argument("--user", type=int, required=True, help="Existing user id.")
+    parser.add_argument("--category", type=int, default=1)
+    parser.add_argument("--iterations", type=int, default=5000)
+    parser.add_argument("--warmup", type=int, default=500)
+    parser.add_argument("--output", default="statements-benchmark.json")
+    return parser.parse_args()
+
+
+async def main(args):
+    """Run statements benchmark and save results."""
+    await db.set_bind(get_database_dsn())
+    try:
+        results = {
+            "gino": await run_path(prepared=False, args=args),
+            "prepared": await run_path(prepared=True, args=args)
+        }
+    finally:
+        await db.pop_bind().close()
+
+    params = {key: value for key, value in vars(args).items() if key != "output"}
+    report = save_results(args.output, "statements", params, results)
+    print(json.dumps(report["results"], indent=2))
+
+
+if __name__ == '__main__':
+    asyncio.run(main(parse_args()))
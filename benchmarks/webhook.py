@@ -0,0 +1,182 @@
+"""
+This module provides end-to-end load benchmark of monobank webhook.
+
+The collector app is started in-process against postgres and redis configured
+by the usual environment variables (or an already running collector is used with
+--url) and telegram requests are sent to in-process fake telegram server.
+Users passed with --users must exist in database, notification latency is
+measured only for users with telegram enabled. Keep in mind TELEGRAM_CHAT_RATE
+limits notifications per user, so use enough users or raise the rate.
+
+Example:
+    python benchmarks/webhook.py --users 1 2 3 --requests 5000 --rate 500 --concurrency 64
+"""
+
+import os
+import sys
+import json
+import time
+import uuid
+import random
+import asyncio
+import re
+import argparse
+
+import jwt
+from aiohttp import ClientSession, TCPConnector, web
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir)))
+
+from benchmarks.common import add_collector_path, save_results, summarize  # noqa: E402
+from benchmarks.fake_telegram import FakeTelegram  # noqa: E402
+
+
+DESCRIPTION_PATTERN = re.compile(r"\*(bench-[0-9a-f]+-\d+)\*")
+MCC_CODES = [4111, 4121, 4131, 5411, 5499, 5812, 5814, 5912, 5999, 7832]
+
+
+def make_payload(run_id, number):
+    """Return webhook payload similar to the one sent by monobank."""
+    amount = random.choice([-1, -1, -1, 1]) * random.randint(100, 500000)
+    return {
+        "type": "StatementItem",
+        "data": {
+            "account": "benchmark",
+            "statementItem": {
+                "id": f"bench-{run_id}-{number}",
+                "time": int(time.time()),
+                "description": f"bench-{run_id}-{number}",
+                "mcc": random.choice(MCC_CODES),
+                "amount": amount,
+                "operationAmount": amount,
+                "currencyCode": 980,
+                "commissionRate": 0,
+                "cashbackAmount": 0,
+                "balance": random.randint(0, 10000000),
+                "hold": True
+            }
+        }
+    }
+
+
+async def start_collector(host, port):
+    """Start collector app in current process and return its runner."""
+    add_collector_path()
+    from app.main import init_app  # pylint: disable=import-outside-toplevel
+
+    runner = web.AppRunner(init_app())
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    return runner
+
+
+async def start_fake_telegram(host, port, throttle_every):
+    """Start fake telegram server in current process."""
+    fake_telegram = FakeTelegram(throttle_every=throttle_every)
+    runner = web.AppRunner(fake_telegram.make_app())
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    return fake_telegram, runner
+
+
+async def run_load(url, tokens, run_id, requests, rate, concurrency):
+    """Send webhooks at fixed rate with bounded concurrency and return per-request stats."""
+    semaphore = asyncio.Semaphore(concurrency)
+    sent_at, latencies, statuses = {}, [], {}
+
+    async def send(session, number):
+        payload = make_payload(run_id, number)
+        token = random.choice(tokens)
+        async with semaphore:
+            started_at = time.time()
+            async with session.post(f"{url}/monobank/{token}", data=json.dumps(payload)) as response:
+                await response.read()
+                statuses[response.status] = statuses.get(response.status, 0) + 1
+
+            latencies.append(time.time() - started_at)
+            sent_at[payload["data"]["statementItem"]["description"]] = started_at
+
+    async with ClientSession(connector=TCPConnector(limit=concurrency)) as session:
+        started_at = time.monotonic()
+        tasks = []
+        for number in range(requests):
+            tasks.append(asyncio.create_task(send(session, number)))
+            delay = started_at + (number + 1) / rate - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+
+        await asyncio.gather(*tasks)
+        duration = time.monotonic() - started_at
+
+    return {"duration": duration, "latencies": latencies, "statuses": statuses, "sent_at": sent_at}
+
+
+def get_notification_latencies(fake_telegram, sent_at):
+    """Match received telegram messages with sent webhooks by transaction description."""
+    latencies = []
+    for message in fake_telegram.messages:
+        match = DESCRIPTION_PATTERN.search(message["text"] or "")
+        if match and match.group(1) in sent_at:
+            latencies.append(message["received_at"] - sent_at[match.group(1)])
+
+    return latencies
+
+
+def parse_args():
+    """Parse benchmark command line arguments."""
+    parser = argparse.ArgumentParser(description="Monobank webhook load benchmark.")
+    parser.add_argument("--url", help="Use already running collector instead of starting it in-process.")
+    parser.add_argument("--host", default="localhost")
+    parser.add_argument("--port", type=int, default=5011)
+    parser.add_argument("--telegram-port", type=int, default=8081)
+    parser.add_argument("--telegram-throttle-every", type=int, default=0)
+    parser.add_argument("--users", type=int, nargs="+", required=True, help="Existing user ids.")
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--rate", type=float, default=200, help="Webhooks per second.")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--notification-wait", type=float, default=5, help="Seconds to wait for notifications.")
+    parser.add_argument("--output", default="webhook-benchmark.json")
+    return parser.parse_args()
+
+
+async def main(args):
+    """Run webhook benchmark and save results."""
+    os.environ["TELEGRAM_API_URL"] = f"http://{args.host}:{args.telegram_port}"
+    fake_telegram, telegram_runner = await start_fake_telegram(
+        args.host, args.telegram_port, args.telegram_throttle_every
+    )
+
+    collector_runner = None
+    url = args.url
+    if url is None:
+        collector_runner = await start_collector(args.host, args.port)
+        url = f"http://{args.host}:{args.port}"
+
+    secret = os.environ["MONOBANK_WEBHOOK_SECRET"]
+    tokens = [jwt.encode({"user_id": user_id}, secret).decode() for user_id in args.users]
+    run_id = uuid.uuid4().hex[:8]
+
+    try:
+        load = await run_load(url, tokens, run_id, args.requests, args.rate, args.concurrency)
+        await asyncio.sleep(args.notification_wait)
+        notification_latencies = get_notification_latencies(fake_telegram, load["sent_at"])
+    finally:
+        if collector_runner is not None:
+            await collector_runner.cleanup()
+        await telegram_runner.cleanup()
+
+    params = {key: value for key, value in vars(args).items() if key != "output"}
+    results = {
+        "throughput": len(load["latencies"]) / load["duration"],
+        "duration": load["duration"],
+        "statuses": load["statuses"],
+        "webhook_latency": summarize(load["latencies"]),
+        "notification_latency": summarize(notification_latencies),
+        "telegram_requests": fake_telegram.requests
+    }
+    report = save_results(args.output, "webhook", params, results)
+    print(json.dumps(report["results"], indent=2))
+
+
+if __name__ == '__main__':
+    asyncio.run(main(parse_args()))
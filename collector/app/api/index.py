@@ -1,9 +1,16 @@
 """This module provides basic collector endpoints."""
 
+import hmac
+import math
 from http import HTTPStatus
 
 from aiohttp import web
+from aiojobs.aiohttp import get_scheduler
 
+from app.middlewares import route_options
+from app.metrics import registry
+from app.profiler import MIN_INTERVAL, profiler
+from app.utils.jobs import get_jobs_stats
 from app.utils.response import make_response
 
 
@@ -11,11 +18,97 @@ internal_routes = web.RouteTableDef()
 
 
 @internal_routes.get("/health")
+@route_options(errors=False)
 async def health_view(request):
-    """Return health OK http status."""
+    """Return health OK http status with background jobs queue depth if worker is ready for traffic."""
+    data = {
+        "ready": request.app.get("ready", False) and not request.app.get("draining", False),
+        "jobs": get_jobs_stats(get_scheduler(request))
+    }
+    if not data["ready"]:
+        return make_response(
+            success=False,
+            message="Service Unavailable. The worker is warming up or shutting down.",
+            data=data,
+            http_status=HTTPStatus.SERVICE_UNAVAILABLE
+        )
+
     return make_response(
         success=True,
         message=f"OK. URL: {str(request.url)}",
+        data=data,
+        http_status=HTTPStatus.OK
+    )
+
+
+def is_authorized(request, secret):
+    """Return True if request carries bearer token equal to secret."""
+    token = request.headers.get("Authorization", "").split("Bearer ")[-1]
+    return hmac.compare_digest(token, secret)
+
+
+@internal_routes.get("/metrics")
+@route_options(errors=False)
+async def metrics_view(request):
+    """Return collected metrics in prometheus text format."""
+    secret = request.app.config.METRICS_TOKEN
+    if not secret:
+        raise web.HTTPNotFound
+    if not is_authorized(request, secret):
+        return make_response(
+            success=False,
+            message="Forbidden. The provided token is not correct.",
+            http_status=HTTPStatus.FORBIDDEN
+        )
+
+    return web.Response(
+        body=registry.render().encode(),
+        headers={"Content-Type": "text/plain; version=0.0.4; charset=utf-8"}
+    )
+
+
+@internal_routes.post("/internal/profile")
+@route_options()
+async def profile_view(request):
+    """Sample event loop of the worker that handles request and return collapsed stacks."""
+    secret = request.app.config.PROFILER_TOKEN
+    if not secret:
+        raise web.HTTPNotFound
+    if not is_authorized(request, secret):
+        return make_response(
+            success=False,
+            message="Forbidden. The provided token is not correct.",
+            http_status=HTTPStatus.FORBIDDEN
+        )
+    if profiler.active:
+        return make_response(
+            success=False,
+            message="Conflict. The profiler is already running in this worker.",
+            http_status=HTTPStatus.CONFLICT
+        )
+
+    try:
+        seconds = min(float(request.query.get("seconds", 10)), request.app.config.PROFILER_MAX_SECONDS)
+        interval = float(request.query.get("interval", request.app.config.PROFILER_INTERVAL))
+    except ValueError:
+        return make_response(
+            success=False,
+            message="Wrong input. Seconds and interval should be numbers.",
+            http_status=HTTPStatus.BAD_REQUEST
+        )
+    if not (seconds > 0 and math.isfinite(interval)):
+        return make_response(
+            success=False,
+            message="Wrong input. Seconds should be positive and interval should be finite.",
+            http_status=HTTPStatus.BAD_REQUEST
+        )
+
+    interval = max(interval, MIN_INTERVAL)
+    report = await profiler.profile(seconds, interval, request.app.config.PROFILER_SLOW_CALLBACK)
+    return make_response(
+        success=True,
+        message=f"Success. The worker was profiled for {seconds} seconds.",
+        data=report,
         http_status=HTTPStatus.OK
     )
 
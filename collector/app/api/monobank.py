@@ -7,11 +7,16 @@ from aiohttp import web
 from aiojobs.aiohttp import spawn
 
 from app.sio import TransactionEvent
+from app.metrics import STAGE_LATENCY
+from app.middlewares import route_options
 from app.models.mcc import MCC
 from app.models.transaction import Transaction
+from app.utils import codec
 from app.utils.jwt import decode_token
 from app.utils.response import make_response
-from app.utils.errors import TokenError, DatabaseError
+from app.utils.dedup import recent_transactions
+from app.utils.jobs import spawn_optional
+from app.utils.errors import TokenError, DatabaseError, DuplicateError
 from app.utils.monobank import parse_transaction_response
 from app.utils.notification import send_user_notifications
 
@@ -27,9 +32,11 @@ class MonobankWebhook(web.View):
     def parse_user_token(self):
         """Return user id from token in request path."""
         user_collector_token = self.request.match_info["user_collector_token"]
-        payload = decode_token(user_collector_token, self.request.app.config.COLLECTOR_WEBHOOK_SECRET)
+        with STAGE_LATENCY.time("jwt"):
+            payload = decode_token(user_collector_token, self.request.app.config.COLLECTOR_WEBHOOK_SECRET)
         return payload["user_id"]
 
+    @route_options()
     async def get(self):
         """Process first get request by monobank webhook."""
         try:
@@ -40,7 +47,8 @@ class MonobankWebhook(web.View):
                     "success": False,
                     "message": "Forbidden. The provided token is not correct."
                 },
-                status=HTTPStatus.FORBIDDEN
+                status=HTTPStatus.FORBIDDEN,
+                dumps=codec.dumps
             )
 
         LOGGER.info("The monobank webhook for user=%s was initialized.", user_id)
@@ -50,6 +58,7 @@ class MonobankWebhook(web.View):
             http_status=HTTPStatus.OK
         )
 
+    @route_options(database=True, json_body=True)
     async def post(self):
         """Process transaction received from monobank webhook."""
         body = self.request.body
@@ -62,24 +71,34 @@ class MonobankWebhook(web.View):
                     "success": False,
                     "message": "Forbidden. The provided token is not correct."
                 },
-                status=HTTPStatus.FORBIDDEN
+                status=HTTPStatus.FORBIDDEN,
+                dumps=codec.dumps
             )
 
         transaction = parse_transaction_response(body)
-
-        try:
-            mcc_codes = await MCC.get_codes()
-        except DatabaseError:
-            mcc_codes = []
+        with STAGE_LATENCY.time("dedup"):
+            is_duplicate = await recent_transactions.contains(transaction["id"])
+        if is_duplicate:
+            return make_response(
+                success=False,
+                message=f"Failure. The transaction={transaction['id']} already exists.",
+                # We should return always 200 http status to monobank webhook
+                http_status=HTTPStatus.OK
+            )
 
         mcc_code = transaction["mcc"]
-        if mcc_code not in mcc_codes:
-            LOGGER.error("Could not find MCC code=%s in database.", mcc_code)
+        with STAGE_LATENCY.time("mcc"):
+            mcc_exists = MCC.exists(mcc_code)
+        if not mcc_exists:
+            LOGGER.warning("Could not find MCC code=%s in database.", mcc_code)
             mcc_code = -1
 
         try:
-            await Transaction.create_transaction(user_id, mcc_code, transaction)
+            with STAGE_LATENCY.time("insert"):
+                context = await Transaction.create_transaction(user_id, mcc_code, transaction)
         except DatabaseError as err:
+            if isinstance(err, DuplicateError):
+                await recent_transactions.add(transaction["id"])
             return make_response(
                 success=False,
                 message=str(err),
@@ -87,12 +106,19 @@ class MonobankWebhook(web.View):
                 http_status=HTTPStatus.OK
             )
         else:
-            await spawn(self.request, TransactionEvent.emit_new_transaction(user_id, transaction))
-            await spawn(self.request, send_user_notifications(user_id, transaction))
+            await recent_transactions.add(transaction["id"])
+            with STAGE_LATENCY.time("spawn"):
+                await spawn_optional(
+                    self.request,
+                    TransactionEvent.emit_new_transaction(user_id, transaction),
+                    job="emit_new_transaction"
+                )
+                if not self.request.app.config.NOTIFICATION_OUTBOX_ENABLED:
+                    await spawn(self.request, send_user_notifications(user_id, transaction, context))
 
         response_data = {
             "user_id": user_id,
-            "transaction": transaction
+            "transaction_id": transaction["id"]
         }
         return make_response(
             success=True,
@@ -1,12 +1,278 @@
 """This module provides functionality for cache interactions."""
 
-from aiocache import Cache
+import time
+import pickle
+import asyncio
+import logging
+from functools import partial
+from collections import OrderedDict, Counter
+
+import aioredis
 
 from app import config
 
 
-MCC_CODES_CACHE_KEY = "mcc-codes"
-MCC_CATEGORY_CACHE_KEY = "mcc-category--{mcc_code}"
-MCC_CATEGORY_CACHE_EXPIRE = 60 * 60  # 1h
+LOGGER = logging.getLogger(__name__)
+
+MCC_VERSION_CACHE_KEY = "mcc-version"
+MCC_UPDATES_CHANNEL = "mcc-updates"
+USER_UPDATES_CHANNEL = "user-updates"
+TRANSACTION_SEEN_CACHE_KEY = "transaction-seen--{transaction_id}"
+TRANSACTION_EVENTS_CACHE_KEY = "transaction-events--{user_id}"
+TRANSACTION_EVENTS_SEQ_CACHE_KEY = "transaction-events-seq--{user_id}"
+
+
+class LocalCache:
+    """Class that provides bounded in-process LRU cache with per-key expiration."""
+
+    def __init__(self, maxsize, ttl):
+        """Set cache size limit and default time to live in seconds."""
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+
+    def __len__(self):
+        """Return count of currently stored keys."""
+        return len(self._data)
+
+    def get(self, key, default=None):
+        """Return value stored by key if it has not expired yet."""
+        entry = self._data.get(key)
+        if entry is None or entry[1] <= time.monotonic():
+            if entry is not None:
+                del self._data[key]
+            self.misses += 1
+            return default
+
+        self._data.move_to_end(key)
+        self.hits += 1
+        return entry[0]
+
+    def set(self, key, value, ttl=None):
+        """Store value by key evicting the least recently used keys if needed."""
+        ttl = self.ttl if ttl is None else ttl
+        self._data[key] = (value, time.monotonic() + ttl)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def delete(self, key):
+        """Remove value stored by key."""
+        self._data.pop(key, None)
+
+    def clear(self):
+        """Remove all stored values."""
+        self._data.clear()
+
+
+class RedisPool:
+    """Class that provides shared aioredis connection pool."""
+
+    def __init__(self, url):
+        """Set redis url for further connecting."""
+        self.url = url
+        self.pool = None
+
+    async def connect(self):
+        """Create connection pool if it was not created yet."""
+        if self.pool is None:
+            self.pool = await aioredis.create_redis_pool(
+                self.url,
+                encoding="utf-8",
+                minsize=config.REDIS_POOL_MIN_SIZE,
+                maxsize=config.REDIS_POOL_MAX_SIZE
+            )
+
+        return self.pool
+
+    async def close(self):
+        """Close connection pool and wait for all connections to be released."""
+        if self.pool is None:
+            return
+
+        self.pool.close()
+        await self.pool.wait_closed()
+        self.pool = None
+
+
+class TieredCache:
+    """
+    Class that provides two-tier cache: bounded in-process LRU (L1) in front of shared redis (L2).
+    Concurrent misses of the same key are coalesced into single load and values older than ttl
+    are served for stale_ttl more seconds while they are reloaded in background.
+    """
+
+    def __init__(self, namespace, maxsize, ttl, stale_ttl=0):
+        """Set namespace of redis keys, L1 size limit, freshness and stale periods in seconds."""
+        self.namespace = namespace
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.local = LocalCache(maxsize=maxsize, ttl=ttl + stale_ttl)
+        self.stats = Counter()
+        self._loading = {}
+
+    @property
+    def hits(self):
+        """Return count of lookups answered by any tier."""
+        return self.stats["l1_hits"] + self.stats["l2_hits"]
+
+    @property
+    def misses(self):
+        """Return count of lookups that required load."""
+        return self.stats["misses"]
+
+    def _get_redis_key(self, key):
+        """Return redis key of cache key within namespace."""
+        return f"{self.namespace}--{key}"
+
+    def _get_ttl(self, value, ttl):
+        """Return ttl of value that may be calculated from value itself."""
+        if ttl is None:
+            return self.ttl
+
+        return ttl(value) if callable(ttl) else ttl
+
+    def _set_local(self, key, entry):
+        """Store value with its freshness deadline in L1 until its stale period ends."""
+        value, fresh_until = entry
+        self.local.set(key, entry, max(fresh_until - time.time(), 0) + self.stale_ttl)
+        return value
+
+    async def get(self, key, loader, ttl=None):
+        """Return cached value by key loading it with loader coroutine function on miss."""
+        entry = self.local.get(key)
+        if entry is not None:
+            self.stats["l1_hits"] += 1
+            if entry[1] <= time.time():
+                self.stats["stale_hits"] += 1
+                self._refresh(key, loader, ttl)
+            return entry[0]
+
+        loading = self._loading.get(key)
+        if loading is not None:
+            self.stats["coalesced"] += 1
+            value, _ = await asyncio.shield(loading)
+            return value
+
+        loading = self._loading[key] = asyncio.ensure_future(self._load(key, loader, ttl))
+        loading.add_done_callback(partial(self._release, key))
+        value, stale = await asyncio.shield(loading)
+        if stale:
+            self._refresh(key, loader, ttl)
+
+        return value
+
+    def _release(self, key, loading):
+        """Forget finished load, its exception is already delivered to waiters."""
+        if self._loading.get(key) is loading:
+            del self._loading[key]
+
+        if not loading.cancelled():
+            loading.exception()
+
+    async def _load(self, key, loader, ttl):
+        """Return value from L2 or loader with flag if it is stale and store it in both tiers."""
+        try:
+            payload = await redis.pool.get(self._get_redis_key(key), encoding=None)
+        except (aioredis.RedisError, OSError) as err:
+            self.stats["errors"] += 1
+            LOGGER.warning("Could not get %s from redis. Error: %s", self._get_redis_key(key), err)
+            payload = None
+
+        if payload is not None:
+            self.stats["l2_hits"] += 1
+            entry = pickle.loads(payload)
+            stale = entry[1] <= time.time()
+            if stale:
+                self.stats["stale_hits"] += 1
+            return self._set_local(key, entry), stale
+
+        self.stats["misses"] += 1
+        value = await loader()
+        await self.set(key, value, ttl)
+        return value, False
+
+    async def _reload(self, key, loader, ttl):
+        """Load fresh value and store it in both tiers."""
+        try:
+            value = await loader()
+        except Exception as err:
+            self.stats["errors"] += 1
+            LOGGER.warning("Could not refresh %s. Error: %s", self._get_redis_key(key), err)
+            raise
+
+        await self.set(key, value, ttl)
+        return value, False
+
+    def _refresh(self, key, loader, ttl):
+        """Reload stale value in background unless it is already being loaded."""
+        if key in self._loading:
+            return
+
+        loading = self._loading[key] = asyncio.ensure_future(self._reload(key, loader, ttl))
+        loading.add_done_callback(partial(self._release, key))
+
+    async def get_many(self, keys):
+        """Return values of keys found in any tier, L2 is queried once for all L1 misses."""
+        values, missed = {}, []
+        for key in keys:
+            entry = self.local.get(key)
+            if entry is None or entry[1] <= time.time():
+                missed.append(key)
+            else:
+                self.stats["l1_hits"] += 1
+                values[key] = entry[0]
+
+        if not missed:
+            return values
+
+        try:
+            payloads = await redis.pool.mget(*map(self._get_redis_key, missed), encoding=None)
+        except (aioredis.RedisError, OSError) as err:
+            self.stats["errors"] += 1
+            LOGGER.warning("Could not get %s keys of %s from redis. Error: %s", len(missed), self.namespace, err)
+            payloads = [None] * len(missed)
+
+        for key, payload in zip(missed, payloads):
+            entry = None if payload is None else pickle.loads(payload)
+            if entry is None or entry[1] <= time.time():
+                self.stats["misses"] += 1
+                continue
+
+            self.stats["l2_hits"] += 1
+            values[key] = self._set_local(key, entry)
+
+        return values
+
+    async def set(self, key, value, ttl=None):
+        """Store value in both tiers."""
+        await self.set_many({key: value}, ttl)
+
+    async def set_many(self, values, ttl=None):
+        """Store values in both tiers writing them to L2 with single pipeline."""
+        pipeline = redis.pool.pipeline()
+        for key, value in values.items():
+            value_ttl = self._get_ttl(value, ttl)
+            entry = (value, time.time() + value_ttl)
+            self._set_local(key, entry)
+            pipeline.set(self._get_redis_key(key), pickle.dumps(entry), expire=int(value_ttl + self.stale_ttl))
+
+        try:
+            await pipeline.execute()
+        except (aioredis.RedisError, OSError) as err:
+            self.stats["errors"] += 1
+            LOGGER.warning("Could not set %s keys of %s in redis. Error: %s", len(values), self.namespace, err)
+
+    async def delete(self, key):
+        """Remove value from both tiers."""
+        self.local.delete(key)
+        try:
+            await redis.pool.delete(self._get_redis_key(key))
+        except (aioredis.RedisError, OSError) as err:
+            self.stats["errors"] += 1
+            LOGGER.warning("Could not delete %s from redis. Error: %s", self._get_redis_key(key), err)
+
 
-cache = Cache.from_url(config.REDIS_URL)
+redis = RedisPool(config.REDIS_URL)
@@ -12,6 +12,16 @@ ROOT_DIR = os.path.abspath(os.path.join(APP_DIR, os.pardir))
 TEMPLATES_DIR = os.path.join(APP_DIR, "templates")
 COLLECTOR_WEBHOOK_SECRET = os.environ["MONOBANK_WEBHOOK_SECRET"]
 
+LOG_JSON = os.getenv("LOG_JSON", "false").lower() == "true"
+LOG_RATE_LIMIT_INTERVAL = float(os.getenv("LOG_RATE_LIMIT_INTERVAL", "10"))  # seconds, 0 disables it
+LOG_RATE_LIMIT_BURST = int(os.getenv("LOG_RATE_LIMIT_BURST", "10"))  # same messages logged per interval
+
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+PROFILER_TOKEN = os.getenv("PROFILER_TOKEN", "")
+PROFILER_MAX_SECONDS = int(os.getenv("PROFILER_MAX_SECONDS", "60"))
+PROFILER_INTERVAL = float(os.getenv("PROFILER_INTERVAL", "0.005"))  # seconds
+PROFILER_SLOW_CALLBACK = float(os.getenv("PROFILER_SLOW_CALLBACK", "0.1"))  # seconds
+
 # Postgres stuff
 POSTGRES_DRIVER_NAME = "postgres"
 POSTGRES_HOST = os.getenv("POSTGRES_HOST", "localhost")
@@ -23,6 +33,12 @@ POSTGRES_POOL_MIN_SIZE = int(os.getenv("POSTGRES_POOL_MIN_SIZE", "1"))
 POSTGRES_POOL_MAX_SIZE = int(os.getenv("POSTGRES_POOL_MAX_SIZE", "16"))
 POSTGRES_RETRY_LIMIT = int(os.getenv("POSTGRES_RETRY_LIMIT", "32"))
 POSTGRES_RETRY_INTERVAL = int(os.getenv("POSTGRES_RETRY_INTERVAL", "1"))
+POSTGRES_PREPARED_STATEMENTS = os.getenv("POSTGRES_PREPARED_STATEMENTS", "false").lower() == "true"
+POSTGRES_BATCH_ENABLED = os.getenv("POSTGRES_BATCH_ENABLED", "false").lower() == "true"
+POSTGRES_BATCH_SIZE = int(os.getenv("POSTGRES_BATCH_SIZE", "64"))
+POSTGRES_BATCH_MAX_LATENCY = int(os.getenv("POSTGRES_BATCH_MAX_LATENCY", "5"))  # ms
+TRANSACTION_PARTITIONS_AHEAD = int(os.getenv("TRANSACTION_PARTITIONS_AHEAD", "2"))  # months
+TRANSACTION_PARTITIONS_CHECK_INTERVAL = int(os.getenv("TRANSACTION_PARTITIONS_CHECK_INTERVAL", "21600"))  # seconds
 POSTGRES_DSN_STAGING = os.getenv("DATABASE_URL")
 POSTGRES_DSN_DEV = URL(
     drivername=POSTGRES_DRIVER_NAME,
@@ -35,10 +51,71 @@ POSTGRES_DSN_DEV = URL(
 
 # REDIS stuff
 REDIS_URL = os.getenv("REDIS_URL", "redis://redis:6379")
+REDIS_POOL_MIN_SIZE = int(os.getenv("REDIS_POOL_MIN_SIZE", "1"))
+REDIS_POOL_MAX_SIZE = int(os.getenv("REDIS_POOL_MAX_SIZE", "16"))
+REDIS_RETRY_INTERVAL = int(os.getenv("REDIS_RETRY_INTERVAL", "1"))
+
+# Socket.IO stuff
+SOCKETIO_MESSAGE_QUEUE = os.getenv("SOCKETIO_MESSAGE_QUEUE", "")  # "redis" to share clients across workers
+SOCKETIO_PUBLISH_BATCH_SIZE = int(os.getenv("SOCKETIO_PUBLISH_BATCH_SIZE", "100"))
+SOCKETIO_PUBLISH_INTERVAL = int(os.getenv("SOCKETIO_PUBLISH_INTERVAL", "2"))  # ms
+SOCKETIO_HOST_TTL = int(os.getenv("SOCKETIO_HOST_TTL", "30"))  # seconds without heartbeat to consider worker dead
+SOCKETIO_REPLAY_SIZE = int(os.getenv("SOCKETIO_REPLAY_SIZE", "100"))  # transaction events kept per user
+SOCKETIO_REPLAY_TTL = int(os.getenv("SOCKETIO_REPLAY_TTL", "3600"))  # seconds
+
+# Duplicate webhooks stuff
+DEDUP_CACHE_SIZE = int(os.getenv("DEDUP_CACHE_SIZE", "100000"))
+DEDUP_TTL = int(os.getenv("DEDUP_TTL", "86400"))  # seconds
+
+# MCC stuff
+MCC_VERSION_CHECK_INTERVAL = int(os.getenv("MCC_VERSION_CHECK_INTERVAL", "60"))
+
+# User stuff
+USER_CACHE_SIZE = int(os.getenv("USER_CACHE_SIZE", "10000"))
+USER_CACHE_TTL = int(os.getenv("USER_CACHE_TTL", "300"))  # seconds
+USER_CACHE_NEGATIVE_TTL = int(os.getenv("USER_CACHE_NEGATIVE_TTL", "60"))  # seconds
+USER_CACHE_STALE_TTL = int(os.getenv("USER_CACHE_STALE_TTL", "60"))  # seconds served stale while reloaded
+
+WARMUP_POSTGRES_CONNECTIONS = int(os.getenv("WARMUP_POSTGRES_CONNECTIONS", str(POSTGRES_POOL_MIN_SIZE)))
+WARMUP_REDIS_CONNECTIONS = int(os.getenv("WARMUP_REDIS_CONNECTIONS", str(REDIS_POOL_MIN_SIZE)))
+WARMUP_USERS = int(os.getenv("WARMUP_USERS", "1000"))  # recently active users primed into cache
 
 # JWT stuff
 JWT_SECRET_KEY = os.environ["JWT_SECRET_KEY"]
+JWT_CACHE_SIZE = int(os.getenv("JWT_CACHE_SIZE", "10000"))
+JWT_CACHE_TTL = int(os.getenv("JWT_CACHE_TTL", "3600"))  # seconds
+JWT_NEGATIVE_CACHE_SIZE = int(os.getenv("JWT_NEGATIVE_CACHE_SIZE", "1000"))
+JWT_NEGATIVE_CACHE_TTL = int(os.getenv("JWT_NEGATIVE_CACHE_TTL", "10"))  # seconds
+
+# Background jobs stuff
+JOBS_LIMIT = int(os.getenv("JOBS_LIMIT", "100"))
+JOBS_PENDING_LIMIT = int(os.getenv("JOBS_PENDING_LIMIT", "10000"))
+JOBS_SHED_PENDING = int(os.getenv("JOBS_SHED_PENDING", "1000"))  # pending jobs count to drop optional ones
+JOBS_DRAIN_TIMEOUT = float(os.getenv("JOBS_DRAIN_TIMEOUT", "10"))  # seconds
+JOBS_CLOSE_TIMEOUT = float(os.getenv("JOBS_CLOSE_TIMEOUT", "0.1"))  # seconds
 
 # Telegram stuff
 TELEGRAM_BOT_TOKEN = os.environ["TELEGRAM_BOT_TOKEN"]
-TELEGRAM_API = f"https://api.telegram.org/bot{TELEGRAM_BOT_TOKEN}"
+TELEGRAM_API_URL = os.getenv("TELEGRAM_API_URL", "https://api.telegram.org")
+TELEGRAM_API = f"{TELEGRAM_API_URL}/bot{TELEGRAM_BOT_TOKEN}"
+TELEGRAM_CONCURRENCY = int(os.getenv("TELEGRAM_CONCURRENCY", "8"))
+TELEGRAM_QUEUE_SIZE = int(os.getenv("TELEGRAM_QUEUE_SIZE", "1000"))
+TELEGRAM_GLOBAL_RATE = float(os.getenv("TELEGRAM_GLOBAL_RATE", "30"))  # messages per second
+TELEGRAM_CHAT_RATE = float(os.getenv("TELEGRAM_CHAT_RATE", "1"))  # messages per second
+TELEGRAM_TIMEOUT = int(os.getenv("TELEGRAM_TIMEOUT", "10"))
+TELEGRAM_RETRY_LIMIT = int(os.getenv("TELEGRAM_RETRY_LIMIT", "3"))
+TELEGRAM_RETRY_INTERVAL = int(os.getenv("TELEGRAM_RETRY_INTERVAL", "1"))
+TELEGRAM_CLOSE_TIMEOUT = int(os.getenv("TELEGRAM_CLOSE_TIMEOUT", "5"))
+# transaction notifications of the same user within window are merged into one digest, 0 disables it
+TELEGRAM_COALESCE_WINDOW = float(os.getenv("TELEGRAM_COALESCE_WINDOW", "0"))  # seconds
+TELEGRAM_COALESCE_MAX_ITEMS = int(os.getenv("TELEGRAM_COALESCE_MAX_ITEMS", "10"))
+
+# Notification outbox stuff
+NOTIFICATION_OUTBOX_ENABLED = os.getenv("NOTIFICATION_OUTBOX_ENABLED", "false").lower() == "true"
+NOTIFICATION_OUTBOX_CONCURRENCY = int(os.getenv("NOTIFICATION_OUTBOX_CONCURRENCY", "32"))
+NOTIFICATION_OUTBOX_POLL_INTERVAL = float(os.getenv("NOTIFICATION_OUTBOX_POLL_INTERVAL", "0.5"))  # seconds
+NOTIFICATION_OUTBOX_LEASE = int(os.getenv("NOTIFICATION_OUTBOX_LEASE", "60"))  # seconds
+NOTIFICATION_OUTBOX_RETRY_LIMIT = int(os.getenv("NOTIFICATION_OUTBOX_RETRY_LIMIT", "8"))
+NOTIFICATION_OUTBOX_RETRY_INTERVAL = int(os.getenv("NOTIFICATION_OUTBOX_RETRY_INTERVAL", "5"))  # seconds
+NOTIFICATION_OUTBOX_RETRY_MAX_INTERVAL = int(os.getenv("NOTIFICATION_OUTBOX_RETRY_MAX_INTERVAL", "3600"))  # seconds
+NOTIFICATION_OUTBOX_STATS_INTERVAL = int(os.getenv("NOTIFICATION_OUTBOX_STATS_INTERVAL", "60"))  # seconds
@@ -1,5 +1,9 @@
 """This module provides functionality for database interactions."""
 
+import re
+from collections import namedtuple
+
+from gino.exceptions import MultipleResultsFound, NoResultFound, UninitializedError
 from gino.ext.aiohttp import Gino
 
 from app import config
@@ -7,7 +11,112 @@ from app import config
 
 db = Gino()
 
+PARAM_PATTERN = re.compile(r"(?<![:\w]):(\w+)\b")
+
 
 def get_database_dsn():
     """Return database dsn based on server mode."""
     return getattr(config, f"POSTGRES_DSN_{config.APP_MODE}")
+
+
+def get_pool_usage():
+    """Return count of opened, idle and used connections of database pool."""
+    try:
+        pool = db.bind.raw_pool
+    except UninitializedError:
+        return {}
+
+    size, idle = pool.get_size(), pool.get_idle_size()
+    return {("max",): pool.get_max_size(), ("size",): size, ("idle",): idle, ("used",): size - idle}
+
+
+def make_row_type(name, columns):
+    """Return tuple type of statement rows that supports both attribute and key access."""
+    base = namedtuple(name, columns)
+
+    def getitem(self, key):
+        """Return column value by its name or position."""
+        if isinstance(key, str):
+            return getattr(self, key)
+
+        return tuple.__getitem__(self, key)
+
+    return type(name, (base,), {"__slots__": (), "__getitem__": getitem})
+
+
+class Statement:
+    """
+    Hot sql statement that can be executed either through gino or directly by asyncpg.
+    asyncpg prepares the query on its first run on each pooled connection and keeps it
+    in connection statement cache, so the direct path skips sqlalchemy compilation and
+    binds parameters by position.
+    """
+
+    def __init__(self, name, sql):
+        """Convert named parameters of sql to positional ones."""
+        self.name = name
+        self.clause = db.text(sql)
+        self.params = []
+        self.query = PARAM_PATTERN.sub(self._replace_param, sql)
+        self.row_type = None
+
+    def _replace_param(self, match):
+        """Return positional placeholder for named parameter."""
+        param = match.group(1)
+        if param not in self.params:
+            self.params.append(param)
+
+        return f"${self.params.index(param) + 1}"
+
+    def _make_rows(self, records):
+        """Convert asyncpg records to statement rows."""
+        if records and self.row_type is None:
+            self.row_type = make_row_type(self.name, list(records[0].keys()))
+
+        return [self.row_type(*record) for record in records]
+
+    async def _run(self, method, params):
+        """Run statement by asyncpg connection that is used by current context."""
+        args = [params[param] for param in self.params]
+        async with db.acquire(reuse=True) as conn:
+            raw_conn = await conn.get_raw_connection()
+            return await getattr(raw_conn, method)(self.query, *args)
+
+    async def all(self, **params):
+        """Return all rows of statement result."""
+        if not config.POSTGRES_PREPARED_STATEMENTS:
+            return await db.all(self.clause, **params)
+
+        return self._make_rows(await self._run("fetch", params))
+
+    async def first(self, **params):
+        """Return first row of statement result or None."""
+        if not config.POSTGRES_PREPARED_STATEMENTS:
+            return await db.first(self.clause, **params)
+
+        record = await self._run("fetchrow", params)
+        return None if record is None else self._make_rows([record])[0]
+
+    async def one(self, **params):
+        """Return the only row of statement result."""
+        if not config.POSTGRES_PREPARED_STATEMENTS:
+            return await db.one(self.clause, **params)
+
+        rows = self._make_rows(await self._run("fetch", params))
+        if len(rows) != 1:
+            raise NoResultFound if not rows else MultipleResultsFound
+        return rows[0]
+
+    async def scalar(self, **params):
+        """Return first column of first row of statement result."""
+        if not config.POSTGRES_PREPARED_STATEMENTS:
+            return await db.scalar(self.clause, **params)
+
+        return await self._run("fetchval", params)
+
+    async def status(self, **params):
+        """Execute statement and return its status."""
+        if not config.POSTGRES_PREPARED_STATEMENTS:
+            return await db.status(self.clause, **params)
+
+        return await self._run("execute", params), []
@@ -1,15 +1,35 @@
 """This module provides app initialization."""
 
 import os
+import asyncio
 import logging
+from contextlib import suppress
 
 from aiohttp.web import Application
-from aiojobs.aiohttp import setup as aiojobs_setup
+from aiojobs.aiohttp import setup as aiojobs_setup, get_scheduler_from_app
 
 from app import config
-from app.db import db, get_database_dsn
-from app.sio import sio
-from app.middlewares import body_validator_middleware, error_middleware
+from app.db import db, get_database_dsn, get_pool_usage
+from app.metrics import registry, Gauge
+from app.cache import redis, MCC_UPDATES_CHANNEL, USER_UPDATES_CHANNEL
+from app.profiler import profiler_middleware
+from app.pubsub import pubsub
+from app.sio import sio, sio_manager
+from app.models.mcc import MCC
+from app.models.outbox import NotificationOutbox
+from app.models.partition import TransactionPartition
+from app.models.spending import CategorySpending
+from app.models.transaction import transaction_writer
+from app.models.user import User
+from app.utils.errors import DatabaseError
+from app.utils.dedup import recent_transactions
+from app.utils.jobs import drain_jobs
+from app.utils.jwt import token_cache, rejected_token_cache
+from app.utils.log import JsonFormatter, RateLimitFilter, queue_logging
+from app.utils.telegram import telegram_client
+from app.utils.warmup import warm_up
+from app.utils.notification import notification_coalescer
+from app.middlewares import pipeline_middleware
 from app.api.monobank import monobank_routes
 from app.api.index import handle_404, handle_405, handle_500, internal_routes
 
@@ -22,8 +42,12 @@ def init_logging():
     """
     Initialize logging stream with info level to console and
     create file logger with info level if permission to file allowed.
+    Records are written by background thread, repeated messages are rate limited.
     """
-    logging.basicConfig(format=LOG_FORMAT, level=logging.INFO)
+    formatter = JsonFormatter() if config.LOG_JSON else logging.Formatter(LOG_FORMAT)
+    stream_handler = logging.StreamHandler()
+    stream_handler.setFormatter(formatter)
+    handlers = [stream_handler]
 
     # disabling gino postgres echo logs
     # in order to set echo pass echo=True to db config dict
@@ -31,12 +55,17 @@ def init_logging():
 
     log_dir = os.getenv("LOG_DIR")
     log_filepath = f'{log_dir}/collector.log'
-    if log_dir and os.path.isdir(log_filepath) and os.access(log_dir, os.W_OK):
-        formatter = logging.Formatter(LOG_FORMAT)
+    if log_dir and os.path.isdir(log_dir) and os.access(log_dir, os.W_OK):
         file_handler = logging.FileHandler(log_filepath)
         file_handler.setLevel(logging.INFO)
         file_handler.setFormatter(formatter)
-        logging.getLogger("").addHandler(file_handler)
+        handlers.append(file_handler)
+
+    logging.getLogger().setLevel(logging.INFO)
+    queue_logging.start(
+        handlers,
+        filters=[RateLimitFilter(config.LOG_RATE_LIMIT_INTERVAL, config.LOG_RATE_LIMIT_BURST)]
+    )
 
 
 async def init_config(app):
@@ -45,14 +74,158 @@ async def init_config(app):
     LOGGER.debug("Application config has successfully set up.")
 
 
+async def init_redis(app):  # pylint: disable=unused-argument
+    """Initialize shared redis connection pool and pub/sub listener."""
+    await redis.connect()
+    await pubsub.start()
+    LOGGER.debug("Redis connections have successfully set up.")
+
+
+async def close_redis(app):  # pylint: disable=unused-argument
+    """Stop pub/sub listener and close redis connection pool."""
+    await pubsub.stop()
+    await redis.close()
+
+
+async def init_mcc(app):
+    """Load MCC reference table (unless it was preloaded before fork) and start watching for its updates."""
+    try:
+        await MCC.refresh(await MCC.get_version())
+    except DatabaseError:
+        LOGGER.error("MCC reference table was not loaded. It will be reloaded by version watcher.")
+
+    app["mcc_watcher"] = asyncio.create_task(MCC.watch_version())
+
+
+async def close_mcc(app):
+    """Stop watching for MCC reference table updates."""
+    mcc_watcher = app["mcc_watcher"]
+    mcc_watcher.cancel()
+    with suppress(asyncio.CancelledError):
+        await mcc_watcher
+
+
+async def init_spending(app):  # pylint: disable=unused-argument
+    """Make sure monthly category spending totals table exists."""
+    await CategorySpending.create_table()
+
+
+async def init_partitions(app):
+    """Create upcoming transaction partitions and keep creating them periodically."""
+    try:
+        await TransactionPartition.ensure(app.config.TRANSACTION_PARTITIONS_AHEAD)
+    except DatabaseError:
+        LOGGER.error("Transaction partitions were not ensured. They will be ensured by partitions watcher.")
+
+    app["partitions_watcher"] = asyncio.create_task(TransactionPartition.watch())
+
+
+async def close_partitions(app):
+    """Stop creating upcoming transaction partitions."""
+    partitions_watcher = app["partitions_watcher"]
+    partitions_watcher.cancel()
+    with suppress(asyncio.CancelledError):
+        await partitions_watcher
+
+
+async def init_outbox(app):
+    """Make sure notification outbox table exists if outbox is enabled."""
+    if app.config.NOTIFICATION_OUTBOX_ENABLED:
+        await NotificationOutbox.create_table()
+
+
+async def init_telegram(app):  # pylint: disable=unused-argument
+    """Open shared telegram client."""
+    await telegram_client.start()
+
+
+async def close_telegram(app):  # pylint: disable=unused-argument
+    """Send pending digests, queued telegram messages and close telegram client."""
+    await notification_coalescer.close()
+    await telegram_client.close()
+
+
+async def init_sio_manager(app):  # pylint: disable=unused-argument
+    """Start heartbeat of worker in shared socketio room index."""
+    if sio_manager is not None:
+        await sio_manager.start()
+
+
+async def close_sio_manager(app):  # pylint: disable=unused-argument
+    """Remove worker rooms from shared socketio room index."""
+    if sio_manager is not None:
+        await sio_manager.close()
+
+
+async def init_warmup(app):
+    """Start warming up connections and caches, worker is reported ready after it."""
+    app["ready"] = False
+    app["warmup"] = asyncio.create_task(warm_up(app))
+
+
+async def close_warmup(app):
+    """Stop warm-up if it is still running."""
+    warmup = app["warmup"]
+    warmup.cancel()
+    with suppress(asyncio.CancelledError):
+        await warmup
+
+
+async def start_draining(app):
+    """Report worker as draining and stop accepting optional jobs."""
+    app["draining"] = True
+
+
+async def close_jobs(app):
+    """Wait for background jobs of handled requests until drain deadline."""
+    scheduler = get_scheduler_from_app(app)
+    unfinished = await drain_jobs(scheduler, app.config.JOBS_DRAIN_TIMEOUT)
+    if unfinished:
+        LOGGER.warning("%s background jobs were not finished before drain deadline.", unfinished)
+
+
+async def close_transaction_writer(app):  # pylint: disable=unused-argument
+    """Write transactions that are still waiting in batch."""
+    await transaction_writer.close()
+
+
+def init_metrics(app):
+    """Register metrics read from application components at collection time."""
+    registry.register_cache("jwt", token_cache)
+    registry.register_cache("jwt_rejected", rejected_token_cache)
+    registry.register_tiered_cache("user_profile", User.profiles)
+    registry.register_tiered_cache("user_limits", User.limits)
+    registry.register_cache("recent_transactions", recent_transactions.local)
+    registry.register(Gauge(
+        "collector_jobs",
+        "Count of active and pending background jobs.",
+        lambda: {
+            ("active",): get_scheduler_from_app(app).active_count,
+            ("pending",): get_scheduler_from_app(app).pending_count
+        },
+        labels=("state",)
+    ))
+    registry.register(Gauge(
+        "collector_db_pool_connections",
+        "Count of database pool connections.",
+        get_pool_usage,
+        labels=("state",)
+    ))
+    registry.register(Gauge(
+        "collector_telegram_queue_size",
+        "Count of telegram messages waiting to be sent.",
+        lambda: telegram_client.queue_size
+    ))
+
+
 def init_db(app):
     """Initialize database postgres connection based on server mode."""
     db.init_app(
         app,
         dict(
             dsn=get_database_dsn(),
-            min_size=config.POSTGRES_POOL_MIN_SIZE,
-            max_size=config.POSTGRES_POOL_MAX_SIZE,
+            pool_min_size=config.POSTGRES_POOL_MIN_SIZE,
+            pool_max_size=config.POSTGRES_POOL_MAX_SIZE,
             retry_limit=config.POSTGRES_RETRY_LIMIT,
             retry_interval=config.POSTGRES_RETRY_INTERVAL
         ),
@@ -103,16 +276,44 @@ def init_app():
     init_db(app)
 
     sio.attach(app)
-    aiojobs_setup(app)
+    aiojobs_setup(
+        app,
+        limit=config.JOBS_LIMIT,
+        pending_limit=config.JOBS_PENDING_LIMIT,
+        close_timeout=config.JOBS_CLOSE_TIMEOUT
+    )
+    init_metrics(app)
 
     app.add_routes(monobank_routes)
     app.add_routes(internal_routes)
 
+    pubsub.subscribe(MCC_UPDATES_CHANNEL, MCC.refresh)
+    pubsub.subscribe(USER_UPDATES_CHANNEL, User.invalidate)
+    if sio_manager is not None:
+        pubsub.subscribe(sio_manager.channel, sio_manager.handle_messages)
+        pubsub.subscribe(sio_manager.host_channel, sio_manager.handle_messages)
+
     app.on_startup.append(init_config)
+    app.on_startup.append(init_redis)
+    app.on_startup.append(init_mcc)
+    app.on_startup.append(init_spending)
+    app.on_startup.append(init_partitions)
+    app.on_startup.append(init_outbox)
+    app.on_startup.append(init_telegram)
+    app.on_startup.append(init_sio_manager)
+    app.on_startup.append(init_warmup)
+    app.on_shutdown.append(close_warmup)
+    app.on_shutdown.append(start_draining)
+    # in-flight requests are handled after shutdown hooks, so their background work is drained
+    # on cleanup, before database engine and job scheduler cleanup hooks registered above
+    for index, close_hook in enumerate((close_jobs, close_transaction_writer, close_telegram, close_sio_manager)):
+        app.on_cleanup.insert(index, close_hook)
+    app.on_cleanup.append(close_partitions)
+    app.on_cleanup.append(close_mcc)
+    app.on_cleanup.append(close_redis)
 
-    app.middlewares.append(db)
-    app.middlewares.append(body_validator_middleware)
-    app.middlewares.append(error_middleware({
+    app.middlewares.append(profiler_middleware)
+    app.middlewares.append(pipeline_middleware({
         404: handle_404,
         405: handle_405,
         500: handle_500
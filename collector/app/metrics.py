@@ -0,0 +1,203 @@
+"""This module provides in-process metrics exposed in prometheus text format."""
+
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+
+def _format_labels(names, values, extra=None):
+    """Return prometheus labels string."""
+    pairs = list(zip(names, values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ""
+
+    labels = ",".join(f'{name}="{str(value)}"' for name, value in pairs)
+    return f"{{{labels}}}"
+
+
+class Counter:
+    """Class that represents monotonically increasing counter."""
+
+    kind = "counter"
+
+    def __init__(self, name, description, labels=()):
+        """Set metric name, help text and label names."""
+        self.name = name
+        self.description = description
+        self.labels = labels
+        self._values = {}
+
+    def inc(self, *labels, value=1):
+        """Increase counter for provided label values."""
+        self._values[labels] = self._values.get(labels, 0) + value
+
+    def render(self):
+        """Return metric samples lines."""
+        return [f"{self.name}{_format_labels(self.labels, labels)} {value}" for labels, value in self._values.items()]
+
+
+class Gauge:
+    """Class that represents value read by callback at collection time."""
+
+    kind = "gauge"
+
+    def __init__(self, name, description, callback, labels=()):
+        """
+        Set metric name, help text and callback. Callback returns a value or,
+        if labels are set, a dict of label values tuples to values.
+        """
+        self.name = name
+        self.description = description
+        self.labels = labels
+        self.callback = callback
+
+    def render(self):
+        """Return metric samples lines."""
+        values = self.callback()
+        if not self.labels:
+            values = {(): values}
+
+        return [
+            f"{self.name}{_format_labels(self.labels, labels)} {value}"
+            for labels, value in values.items()
+            if value is not None
+        ]
+
+
+class CallbackCounter(Gauge):
+    """Class that represents monotonically increasing counter read by callback at collection time."""
+
+    kind = "counter"
+
+
+class Histogram:
+    """Class that represents distribution of observed values in fixed buckets."""
+
+    kind = "histogram"
+
+    def __init__(self, name, description, labels=(), buckets=DEFAULT_BUCKETS):
+        """Set metric name, help text, label names and bucket bounds."""
+        self.name = name
+        self.description = description
+        self.labels = labels
+        self.buckets = buckets
+        self._values = {}
+
+    def observe(self, value, *labels):
+        """Add observed value for provided label values."""
+        counts = self._values.get(labels)
+        if counts is None:
+            # bucket counts followed by total count and sum
+            counts = self._values[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+
+        counts[bisect_left(self.buckets, value)] += 1
+        counts[-1] += value
+
+    @contextmanager
+    def time(self, *labels):
+        """Observe duration of code block in seconds."""
+        started_at = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started_at, *labels)
+
+    def render(self):
+        """Return metric samples lines."""
+        lines = []
+        for labels, counts in self._values.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets + ("+Inf",), counts):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{_format_labels(self.labels, labels, ('le', bound))} {cumulative}")
+
+            lines.append(f"{self.name}_count{_format_labels(self.labels, labels)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labels, labels)} {counts[-1]}")
+
+        return lines
+
+
+class Registry:
+    """Class that collects metrics and renders them in prometheus text format."""
+
+    def __init__(self):
+        """Prepare empty metrics list."""
+        self.metrics = []
+
+    def register(self, metric):
+        """Add metric to registry and return it."""
+        self.metrics.append(metric)
+        return metric
+
+    def register_cache(self, name, cache):
+        """Expose hits, misses and hit ratio of in-process cache."""
+        self.register(CallbackCounter(
+            "collector_cache_hits_total",
+            "Count of cache hits.",
+            lambda: {(name,): cache.hits},
+            labels=("cache",)
+        ))
+        self.register(CallbackCounter(
+            "collector_cache_misses_total",
+            "Count of cache misses.",
+            lambda: {(name,): cache.misses},
+            labels=("cache",)
+        ))
+        self.register(Gauge(
+            "collector_cache_hit_ratio",
+            "Ratio of cache hits to all cache lookups.",
+            lambda: {(name,): cache.hits / (cache.hits + cache.misses) if cache.hits + cache.misses else None},
+            labels=("cache",)
+        ))
+
+    def register_tiered_cache(self, name, cache):
+        """Expose hits, misses and events of each tier of two-tier cache."""
+        self.register_cache(name, cache)
+        self.register(CallbackCounter(
+            "collector_cache_events_total",
+            "Count of two-tier cache events: tier hits, stale hits, coalesced misses and redis errors.",
+            lambda: {(name, event): count for event, count in cache.stats.items()},
+            labels=("cache", "event")
+        ))
+
+    def render(self):
+        """Return all metrics in prometheus text format."""
+        families = {}
+        for metric in self.metrics:
+            if metric.name not in families:
+                families[metric.name] = [
+                    f"# HELP {metric.name} {metric.description}",
+                    f"# TYPE {metric.name} {metric.kind}"
+                ]
+            families[metric.name].extend(metric.render())
+
+        return "\n".join(line for lines in families.values() for line in lines) + "\n"
+
+
+registry = Registry()
+
+STAGE_LATENCY = registry.register(Histogram(
+    "collector_stage_duration_seconds",
+    "Latency of ingest pipeline stages.",
+    labels=("stage",)
+))
+SQL_LATENCY = registry.register(Histogram(
+    "collector_sql_duration_seconds",
+    "Latency of SQL statements.",
+    labels=("statement",)
+))
+TELEGRAM_SENDS = registry.register(Counter(
+    "collector_telegram_sends_total",
+    "Outcomes of telegram send attempts.",
+    labels=("outcome",)
+))
+SHED_JOBS = registry.register(Counter(
+    "collector_jobs_shed_total",
+    "Count of optional background jobs dropped under load.",
+    labels=("job",)
+))
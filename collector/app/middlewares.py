@@ -1,12 +1,48 @@
 """This module provides middlewares for collector application."""
 
-import json
+from functools import partial
 from http import HTTPStatus
+from collections import namedtuple
 
 from aiohttp import web
 
+from app.db import db
+from app.metrics import STAGE_LATENCY
+from app.utils import codec
 
-SOCKET_ROUTE = "/socket.io"
+
+RouteOptions = namedtuple("RouteOptions", ("database", "json_body", "errors"))
+
+# routes that did not declare options (e.g. socketio) take minimal path
+DEFAULT_ROUTE_OPTIONS = RouteOptions(database=False, json_body=False, errors=False)
+# unmatched routes only need error mapping to render 404/405 responses
+UNMATCHED_ROUTE_OPTIONS = RouteOptions(database=False, json_body=False, errors=True)
+
+
+def route_options(*, database=False, json_body=False, errors=True):
+    """Declare what route handler requires: database connection, parsed json body, error mapping."""
+    def decorator(handler):
+        handler.route_options = RouteOptions(database=database, json_body=json_body, errors=errors)
+        return handler
+
+    return decorator
+
+
+def get_route_handler(request):
+    """Return function that handles matched route for request method."""
+    handler = request.match_info.handler
+    if isinstance(handler, type) and issubclass(handler, web.View):
+        handler = getattr(handler, request.method.lower(), None)
+
+    return handler
+
+
+def get_route_options(request):
+    """Return options declared by handler of matched route."""
+    if request.match_info.http_exception is not None:
+        return UNMATCHED_ROUTE_OPTIONS
+
+    return getattr(get_route_handler(request), "route_options", DEFAULT_ROUTE_OPTIONS)
 
 
 def error_middleware(error_handlers):
@@ -29,15 +65,48 @@ def error_middleware(error_handlers):
 
 @web.middleware
 async def body_validator_middleware(request, handler):
-    """Check if provided body data for mutation methods is correct."""
-    if not request.path.startswith(SOCKET_ROUTE) and request.body_exists:
-        content = await request.read()
+    """Parse and check json body for routes that declared they require it."""
+    if get_route_options(request).json_body and request.body_exists:
         try:
-            request.body = json.loads(content)
-        except json.decoder.JSONDecodeError:
+            with STAGE_LATENCY.time("body"):
+                request.body = codec.loads(await request.read())
+        except codec.DecodeError:
             return web.json_response(
                 data={"success": False, "message": "Wrong input. Can't deserialize body input."},
-                status=HTTPStatus.BAD_REQUEST
+                status=HTTPStatus.BAD_REQUEST,
+                dumps=codec.dumps
             )
 
     return await handler(request)
+
+
+def pipeline_middleware(error_handlers):
+    """Return middleware that runs only middlewares declared by matched route."""
+    error_middleware_inner = error_middleware(error_handlers)
+    chains = {}
+
+    def get_chain(options):
+        """Return middlewares required by route options in calling order."""
+        chain = chains.get(options)
+        if chain is None:
+            chain = chains[options] = tuple(
+                middleware
+                for middleware, required in (
+                    (db, options.database),
+                    (body_validator_middleware, options.json_body),
+                    (error_middleware_inner, options.errors)
+                )
+                if required
+            )
+
+        return chain
+
+    @web.middleware
+    async def pipeline_middleware_inner(request, handler):
+        """Wrap handler into middlewares required by matched route."""
+        for middleware in reversed(get_chain(get_route_options(request))):
+            handler = partial(middleware, handler=handler)
+
+        return await handler(request)
+
+    return pipeline_middleware_inner
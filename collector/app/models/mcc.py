@@ -1,65 +1,90 @@
 """Module that includes functionality to work with mcc data."""
 
+import asyncio
 import logging
+from collections import namedtuple
 
-from gino import exceptions
+import aioredis
 from sqlalchemy.exc import SQLAlchemyError
 
+from app import config
 from app.db import db
-from app.cache import cache, MCC_CODES_CACHE_KEY, MCC_CATEGORY_CACHE_KEY, MCC_CATEGORY_CACHE_EXPIRE
+from app.cache import redis, MCC_VERSION_CACHE_KEY
+from app.metrics import SQL_LATENCY
 from app.utils.errors import DatabaseError
 
 
 LOGGER = logging.getLogger(__name__)
 
+MCCSnapshot = namedtuple("MCCSnapshot", ("version", "codes", "categories", "category_ids", "loaded"))
+
 
 class MCC:
     """Class that provides methods to work with MCC data."""
 
     OTHER_CATEGORY = "Other"
-    SELECT_CODES = db.text("""
-        SELECT code FROM mcc;
-    """)
-    SELECT_CATEGORY = db.text("""
-        SELECT name
+    SELECT_MCC_TABLE = db.text("""
+        SELECT mcc.code, mcc.category_id, mcc_category.name as category_name
         FROM mcc
         LEFT JOIN mcc_category on mcc_category.id=mcc.category_id
-        WHERE code=:mcc_code
     """)
 
+    # worker-local snapshot of the MCC reference table, replaced as a whole on reload
+    snapshot = MCCSnapshot(version=None, codes=frozenset(), categories={}, category_ids={}, loaded=False)
+
     @classmethod
-    async def get_codes(cls):
-        """Retrieve all MCC codes."""
-        mcc_codes = await cache.get(MCC_CODES_CACHE_KEY)
-        if mcc_codes:
-            return mcc_codes
+    async def load(cls, version=None):
+        """Load MCC reference table from database into worker memory."""
         try:
-            mcc_codes = [mcc.code for mcc in await db.all(cls.SELECT_CODES)]
+            with SQL_LATENCY.time("select_mcc_table"):
+                mcc_table = await db.all(cls.SELECT_MCC_TABLE)
         except SQLAlchemyError as err:
-            LOGGER.error("Could not retrieve all MCC codes. Error: %s", err)
-            raise DatabaseError("Failure. Failed to retrieve all MCC codes.")
-        else:
-            await cache.set(MCC_CODES_CACHE_KEY, mcc_codes)
+            LOGGER.error("Could not retrieve MCC reference table. Error: %s", err)
+            raise DatabaseError("Failure. Failed to retrieve MCC reference table.")
 
-        return mcc_codes
+        cls.snapshot = MCCSnapshot(
+            version=version,
+            codes=frozenset(mcc.code for mcc in mcc_table),
+            categories={mcc.code: mcc.category_name for mcc in mcc_table if mcc.category_name},
+            category_ids={mcc.code: mcc.category_id for mcc in mcc_table if mcc.category_id},
+            loaded=True
+        )
+        LOGGER.info("MCC reference table (version=%s) was loaded: %s codes.", version, len(cls.snapshot.codes))
 
     @classmethod
-    async def get_category(cls, mcc_code):
-        """Retrieve MCC category by provided id."""
-        mcc_category_key = MCC_CATEGORY_CACHE_KEY.format(mcc_code=mcc_code)
-        mcc_category = await cache.get(mcc_category_key)
-        if mcc_category:
-            return mcc_category
+    async def get_version(cls):
+        """Return current MCC reference table version published to redis."""
+        return await redis.pool.get(MCC_VERSION_CACHE_KEY)
 
-        try:
-            mcc_category = await db.one(cls.SELECT_CATEGORY, mcc_code=mcc_code)
-        except exceptions.NoResultFound:
-            LOGGER.error("Could not find category for mcc code=%s.", mcc_code)
-            return cls.OTHER_CATEGORY
-        except SQLAlchemyError as err:
-            LOGGER.error("Could not retrieve all MCC category for code=%s. Error: %s", mcc_code, err)
-            raise DatabaseError(f"Failure. Failed to retrieve MCC category for code={mcc_code}.")
-        else:
-            await cache.set(mcc_category_key, mcc_category.name, MCC_CATEGORY_CACHE_EXPIRE)
+    @classmethod
+    async def refresh(cls, version):
+        """Reload MCC reference table if provided version differs from loaded one."""
+        if cls.snapshot.loaded and cls.snapshot.version == version:
+            return
+
+        await cls.load(version)
 
-        return mcc_category.name
+    @classmethod
+    async def watch_version(cls):
+        """Periodically check MCC version key in case pub/sub message was missed."""
+        while True:
+            await asyncio.sleep(config.MCC_VERSION_CHECK_INTERVAL)
+            try:
+                await cls.refresh(await cls.get_version())
+            except (aioredis.RedisError, OSError, DatabaseError) as err:
+                LOGGER.error("Could not refresh MCC reference table. Error: %s", err)
+
+    @classmethod
+    def exists(cls, mcc_code):
+        """Check if MCC code is present in reference table."""
+        return mcc_code in cls.snapshot.codes
+
+    @classmethod
+    def get_category(cls, mcc_code):
+        """Return MCC category name by provided code."""
+        return cls.snapshot.categories.get(mcc_code, cls.OTHER_CATEGORY)
+
+    @classmethod
+    def get_category_id(cls, mcc_code):
+        """Return MCC category id by provided code."""
+        return cls.snapshot.category_ids.get(mcc_code)
@@ -0,0 +1,170 @@
+"""Module that includes functionality to work with notification outbox."""
+
+import json
+import logging
+
+from sqlalchemy.exc import SQLAlchemyError
+
+from app.db import db
+from app.metrics import SQL_LATENCY
+from app.utils.errors import DatabaseError
+
+
+LOGGER = logging.getLogger(__name__)
+
+
+class NotificationOutbox:
+    """Class that provides methods to work with pending user notifications."""
+
+    TABLE_LOCK_ID = 5011
+    LOCK_TABLE_CREATION = db.text("""
+        SELECT pg_advisory_xact_lock(:lock_id);
+    """)
+    CREATE_TABLE = db.text("""
+        CREATE TABLE IF NOT EXISTS notification_outbox (
+            id bigserial PRIMARY KEY,
+            user_id integer NOT NULL,
+            transaction jsonb NOT NULL,
+            attempts integer NOT NULL DEFAULT 0,
+            created_at timestamp NOT NULL DEFAULT now(),
+            next_attempt_at timestamp NOT NULL DEFAULT now(),
+            failed_at timestamp,
+            last_error text
+        );
+    """)
+    CREATE_INDEX = db.text("""
+        CREATE INDEX IF NOT EXISTS notification_outbox_pending_idx
+        ON notification_outbox (next_attempt_at)
+        WHERE failed_at IS NULL;
+    """)
+    ADD_NOTIFICATIONS = db.text("""
+        INSERT INTO notification_outbox (user_id, transaction)
+        SELECT outbox.user_id, CAST(outbox.transaction AS jsonb)
+        FROM unnest(
+            CAST(:user_ids AS integer[]),
+            CAST(:transactions AS text[])
+        ) AS outbox(user_id, transaction);
+    """)
+    CLAIM_NOTIFICATIONS = db.text("""
+        UPDATE notification_outbox
+        SET attempts = attempts + 1,
+            next_attempt_at = now() + make_interval(secs => :lease)
+        WHERE id IN (
+            SELECT id
+            FROM notification_outbox
+            WHERE failed_at IS NULL and next_attempt_at <= now()
+            ORDER BY next_attempt_at
+            LIMIT :limit
+            FOR UPDATE SKIP LOCKED
+        )
+        RETURNING id, user_id, CAST(transaction AS text) as transaction, attempts, created_at
+    """)
+    COMPLETE_NOTIFICATION = db.text("""
+        DELETE FROM notification_outbox
+        WHERE id = :notification_id
+    """)
+    RETRY_NOTIFICATION = db.text("""
+        UPDATE notification_outbox
+        SET next_attempt_at = now() + make_interval(secs => :delay),
+            last_error = :error
+        WHERE id = :notification_id
+    """)
+    FAIL_NOTIFICATION = db.text("""
+        UPDATE notification_outbox
+        SET failed_at = now(),
+            last_error = :error
+        WHERE id = :notification_id
+    """)
+    SELECT_STATS = db.text("""
+        SELECT count(*) FILTER (WHERE failed_at IS NULL) as pending,
+            count(*) FILTER (WHERE failed_at IS NOT NULL) as failed,
+            coalesce(extract(epoch FROM now() - min(created_at) FILTER (WHERE failed_at IS NULL)), 0) as lag
+        FROM notification_outbox
+    """)
+
+    @classmethod
+    async def create_table(cls):
+        """Create notification outbox table if it does not exist yet."""
+        try:
+            async with db.transaction():
+                await db.status(cls.LOCK_TABLE_CREATION, lock_id=cls.TABLE_LOCK_ID)
+                await db.status(cls.CREATE_TABLE)
+                await db.status(cls.CREATE_INDEX)
+        except SQLAlchemyError as err:
+            LOGGER.error("Could not create notification outbox table. Error: %s", err)
+            raise DatabaseError("Failure. Failed to create notification outbox table.")
+
+    @classmethod
+    async def add(cls, rows):
+        """
+        Add notification intents for inserted transaction rows.
+        Should be called within the same database transaction as the insert.
+        """
+        if not rows:
+            return
+
+        with SQL_LATENCY.time("add_notifications"):
+            await db.status(
+                cls.ADD_NOTIFICATIONS,
+                user_ids=[row["user_id"] for row in rows],
+                transactions=[json.dumps(row["transaction"]) for row in rows]
+            )
+
+    @classmethod
+    async def claim(cls, limit, lease):
+        """Lock pending notifications for processing during lease seconds."""
+        try:
+            with SQL_LATENCY.time("claim_notifications"):
+                notifications = await db.all(cls.CLAIM_NOTIFICATIONS, limit=limit, lease=lease)
+        except SQLAlchemyError as err:
+            LOGGER.error("Could not claim pending notifications. Error: %s", err)
+            raise DatabaseError("Failure. Failed to claim pending notifications.")
+
+        return [
+            {
+                "id": notification.id,
+                "user_id": notification.user_id,
+                "transaction": json.loads(notification.transaction),
+                "attempts": notification.attempts,
+                "created_at": notification.created_at
+            }
+            for notification in notifications
+        ]
+
+    @classmethod
+    async def complete(cls, notification_id):
+        """Remove delivered notification from outbox."""
+        try:
+            await db.status(cls.COMPLETE_NOTIFICATION, notification_id=notification_id)
+        except SQLAlchemyError as err:
+            LOGGER.error("Could not complete notification=%s. Error: %s", notification_id, err)
+            raise DatabaseError(f"Failure. Failed to complete notification={notification_id}.")
+
+    @classmethod
+    async def retry(cls, notification_id, delay, error):
+        """Schedule next delivery attempt of notification."""
+        try:
+            await db.status(cls.RETRY_NOTIFICATION, notification_id=notification_id, delay=delay, error=error)
+        except SQLAlchemyError as err:
+            LOGGER.error("Could not reschedule notification=%s. Error: %s", notification_id, err)
+            raise DatabaseError(f"Failure. Failed to reschedule notification={notification_id}.")
+
+    @classmethod
+    async def fail(cls, notification_id, error):
+        """Mark notification as failed so it will not be delivered anymore."""
+        try:
+            await db.status(cls.FAIL_NOTIFICATION, notification_id=notification_id, error=error)
+        except SQLAlchemyError as err:
+            LOGGER.error("Could not mark notification=%s as failed. Error: %s", notification_id, err)
+            raise DatabaseError(f"Failure. Failed to mark notification={notification_id} as failed.")
+
+    @classmethod
+    async def get_stats(cls):
+        """Return count of pending and failed notifications and age of the oldest pending one."""
+        try:
+            stats = await db.one(cls.SELECT_STATS)
+        except SQLAlchemyError as err:
+            LOGGER.error("Could not retrieve notification outbox stats. Error: %s", err)
+            raise DatabaseError("Failure. Failed to retrieve notification outbox stats.")
+
+        return {"pending": stats.pending, "failed": stats.failed, "lag": float(stats.lag)}
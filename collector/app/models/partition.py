@@ -0,0 +1,248 @@
+"""Module that includes functionality to manage monthly partitions of transaction table."""
+
+import re
+import asyncio
+import logging
+from datetime import date, datetime
+
+from asyncpg import exceptions
+from sqlalchemy.exc import SQLAlchemyError
+
+from app import config
+from app.db import db
+from app.utils.errors import DatabaseError
+
+
+LOGGER = logging.getLogger(__name__)
+
+UPPER_BOUND_PATTERN = re.compile(r"TO \('(\d{4}-\d{2}-\d{2})")
+
+
+def add_months(month, count):
+    """Return first day of month shifted by count of months."""
+    month_index = month.year * 12 + month.month - 1 + count
+    return date(month_index // 12, month_index % 12 + 1, 1)
+
+
+class TransactionPartition:
+    """Class that provides methods to work with monthly partitions of transaction table."""
+
+    TABLE_LOCK_ID = 5012
+    PARTITION_NAME = "transaction_y{month:%Y}m{month:%m}"
+    LOCK_PARTITIONS = db.text("""
+        SELECT pg_advisory_xact_lock(:lock_id);
+    """)
+    SELECT_IS_PARTITIONED = db.text("""
+        SELECT relkind = 'p'
+        FROM pg_class
+        WHERE oid = to_regclass('transaction')
+    """)
+    SELECT_PARTITIONS = db.text("""
+        SELECT partition.relname as name, pg_get_expr(partition.relpartbound, partition.oid) as bound
+        FROM pg_inherits
+        JOIN pg_class as partition on partition.oid=pg_inherits.inhrelid
+        WHERE pg_inherits.inhparent = to_regclass('transaction')
+    """)
+    LOCK_TRANSACTION = db.text("""
+        LOCK TABLE transaction IN ACCESS EXCLUSIVE MODE;
+    """)
+    RENAME_TRANSACTION = db.text("""
+        ALTER TABLE transaction RENAME TO transaction_legacy;
+    """)
+    CREATE_PARTITIONED_TRANSACTION = db.text("""
+        CREATE TABLE transaction (
+            LIKE transaction_legacy INCLUDING DEFAULTS INCLUDING CONSTRAINTS,
+            PRIMARY KEY (id, timestamp)
+        ) PARTITION BY RANGE (timestamp);
+    """)
+    SELECT_LEGACY_FOREIGN_KEYS = db.text("""
+        SELECT conname as name, pg_get_constraintdef(oid) as definition
+        FROM pg_constraint
+        WHERE conrelid = to_regclass('transaction_legacy') and contype = 'f'
+    """)
+    CREATE_FOREIGN_KEY = 'ALTER TABLE transaction ADD CONSTRAINT "{name}" {definition};'
+    SELECT_LEGACY_PRIMARY_KEY = db.text("""
+        SELECT conname
+        FROM pg_constraint
+        WHERE conrelid = to_regclass('transaction_legacy') and contype = 'p'
+    """)
+    DROP_LEGACY_PRIMARY_KEY = 'ALTER TABLE transaction_legacy DROP CONSTRAINT "{name}";'
+    SELECT_LEGACY_BOUND = db.text("""
+        SELECT CAST(date_trunc('month', greatest(max(timestamp), now())) + interval '1 month' AS date)
+        FROM transaction_legacy
+    """)
+    ATTACH_LEGACY = (
+        "ALTER TABLE transaction ATTACH PARTITION transaction_legacy "
+        "FOR VALUES FROM (MINVALUE) TO ('{bound}');"
+    )
+    CREATE_PARTITION = (
+        "CREATE TABLE IF NOT EXISTS {name} PARTITION OF transaction "
+        "FOR VALUES FROM ('{start}') TO ('{end}');"
+    )
+    CREATE_TRANSACTION_IDS = db.text("""
+        CREATE TABLE transaction_id (
+            id text PRIMARY KEY
+        );
+    """)
+    FILL_TRANSACTION_IDS = db.text("""
+        INSERT INTO transaction_id (id)
+        SELECT id FROM transaction_legacy;
+    """)
+    CREATE_CLAIM_ID_FUNCTION = db.text("""
+        CREATE OR REPLACE FUNCTION transaction_claim_id() RETURNS trigger AS $$
+        BEGIN
+            INSERT INTO transaction_id (id) VALUES (NEW.id) ON CONFLICT DO NOTHING;
+            IF NOT FOUND THEN
+                RETURN NULL;
+            END IF;
+            RETURN NEW;
+        END;
+        $$ LANGUAGE plpgsql;
+    """)
+    CREATE_CLAIM_ID_TRIGGER = db.text("""
+        CREATE TRIGGER transaction_claim_id BEFORE INSERT ON transaction
+        FOR EACH ROW EXECUTE FUNCTION transaction_claim_id();
+    """)
+    CREATE_INDEXES = db.text("""
+        CREATE INDEX IF NOT EXISTS transaction_user_timestamp_idx
+        ON transaction (user_id, timestamp) INCLUDE (amount, mcc);
+    """)
+    DETACH_PARTITION = 'ALTER TABLE transaction DETACH PARTITION "{name}";'
+    CREATE_ARCHIVE_SCHEMA = 'CREATE SCHEMA IF NOT EXISTS "{schema}";'
+    ARCHIVE_PARTITION = 'ALTER TABLE "{name}" SET SCHEMA "{schema}";'
+
+    @classmethod
+    async def is_partitioned(cls):
+        """Check if transaction table is partitioned."""
+        return bool(await db.scalar(cls.SELECT_IS_PARTITIONED))
+
+    @classmethod
+    async def get_partitions(cls):
+        """Return partitions of transaction table mapped by name to their upper bound month."""
+        partitions = {}
+        for partition in await db.all(cls.SELECT_PARTITIONS):
+            upper_bound = UPPER_BOUND_PATTERN.search(partition.bound)
+            partitions[partition.name] = date.fromisoformat(upper_bound.group(1)) if upper_bound else None
+
+        return partitions
+
+    @classmethod
+    async def migrate(cls, months_ahead):
+        """
+        Convert plain transaction table to table partitioned by month. Existing table
+        becomes the first partition that holds all rows up to the next month. Foreign
+        keys are not copied by LIKE, so they are re-created on partitioned table
+        before attaching, attached table reuses its own equivalent ones.
+        Primary key of partitioned table has to include timestamp, so primary key of
+        existing table is replaced by it and transaction ids are claimed in transaction_id
+        table by insert trigger that skips rows with already claimed id, like
+        ON CONFLICT DO NOTHING does.
+        Return False if transaction table is already partitioned.
+        """
+        try:
+            async with db.transaction():
+                await db.status(cls.LOCK_PARTITIONS, lock_id=cls.TABLE_LOCK_ID)
+                if await cls.is_partitioned():
+                    return False
+
+                await db.status(cls.LOCK_TRANSACTION)
+                await db.status(cls.RENAME_TRANSACTION)
+                await db.status(cls.CREATE_PARTITIONED_TRANSACTION)
+                for foreign_key in await db.all(cls.SELECT_LEGACY_FOREIGN_KEYS):
+                    await db.status(db.text(cls.CREATE_FOREIGN_KEY.format(
+                        name=foreign_key.name,
+                        definition=foreign_key.definition
+                    )))
+                primary_key = await db.scalar(cls.SELECT_LEGACY_PRIMARY_KEY)
+                if primary_key is not None:
+                    await db.status(db.text(cls.DROP_LEGACY_PRIMARY_KEY.format(name=primary_key)))
+                bound = await db.scalar(cls.SELECT_LEGACY_BOUND)
+                await db.status(db.text(cls.ATTACH_LEGACY.format(bound=bound.isoformat())))
+                await db.status(cls.CREATE_INDEXES)
+                await db.status(cls.CREATE_TRANSACTION_IDS)
+                await db.status(cls.FILL_TRANSACTION_IDS)
+                await db.status(cls.CREATE_CLAIM_ID_FUNCTION)
+                await db.status(cls.CREATE_CLAIM_ID_TRIGGER)
+                await cls._create_partitions(months_ahead)
+        except (SQLAlchemyError, exceptions.PostgresError) as err:
+            LOGGER.error("Could not partition transaction table. Error: %s", err)
+            raise DatabaseError("Failure. Failed to partition transaction table.")
+
+        LOGGER.info("Transaction table was partitioned by month. Rows before %s are in transaction_legacy.", bound)
+        return True
+
+    @classmethod
+    async def ensure(cls, months_ahead):
+        """Create missing partitions from current month to months ahead if transaction table is partitioned."""
+        try:
+            async with db.transaction():
+                await db.status(cls.LOCK_PARTITIONS, lock_id=cls.TABLE_LOCK_ID)
+                if not await cls.is_partitioned():
+                    return []
+
+                return await cls._create_partitions(months_ahead)
+        except (SQLAlchemyError, exceptions.PostgresError) as err:
+            LOGGER.error("Could not create transaction partitions. Error: %s", err)
+            raise DatabaseError("Failure. Failed to create transaction partitions.")
+
+    @classmethod
+    async def _create_partitions(cls, months_ahead):
+        """Create partitions for months that are not covered yet. Return names of created partitions."""
+        upper_bounds = [bound for bound in (await cls.get_partitions()).values() if bound is not None]
+        month = datetime.now().date().replace(day=1)
+        if upper_bounds:
+            month = max(month, max(upper_bounds))
+
+        created = []
+        last_month = add_months(datetime.now().date().replace(day=1), months_ahead)
+        while month <= last_month:
+            name = cls.PARTITION_NAME.format(month=month)
+            next_month = add_months(month, 1)
+            await db.status(db.text(cls.CREATE_PARTITION.format(
+                name=name,
+                start=month.isoformat(),
+                end=next_month.isoformat()
+            )))
+            created.append(name)
+            month = next_month
+
+        if created:
+            LOGGER.info("Transaction partitions were created: %s.", ", ".join(created))
+        return created
+
+    @classmethod
+    async def detach(cls, before, archive_schema=None):
+        """
+        Detach partitions that hold only transactions older than before month and
+        optionally move them to archive schema. Return names of detached partitions.
+        """
+        try:
+            async with db.transaction():
+                await db.status(cls.LOCK_PARTITIONS, lock_id=cls.TABLE_LOCK_ID)
+                partitions = await cls.get_partitions()
+                detached = sorted(
+                    name for name, upper_bound in partitions.items()
+                    if upper_bound is not None and upper_bound <= before
+                )
+                if archive_schema and detached:
+                    await db.status(db.text(cls.CREATE_ARCHIVE_SCHEMA.format(schema=archive_schema)))
+
+                for name in detached:
+                    await db.status(db.text(cls.DETACH_PARTITION.format(name=name)))
+                    if archive_schema:
+                        await db.status(db.text(cls.ARCHIVE_PARTITION.format(name=name, schema=archive_schema)))
+        except (SQLAlchemyError, exceptions.PostgresError) as err:
+            LOGGER.error("Could not detach transaction partitions. Error: %s", err)
+            raise DatabaseError("Failure. Failed to detach transaction partitions.")
+
+        return detached
+
+    @classmethod
+    async def watch(cls):
+        """Periodically create upcoming partitions for long running workers."""
+        while True:
+            await asyncio.sleep(config.TRANSACTION_PARTITIONS_CHECK_INTERVAL)
+            try:
+                await cls.ensure(config.TRANSACTION_PARTITIONS_AHEAD)
+            except DatabaseError as err:
+                LOGGER.error("Could not ensure transaction partitions. Error: %s", err)
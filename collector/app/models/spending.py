@@ -0,0 +1,111 @@
+"""Module that includes functionality to work with monthly category spending."""
+
+import logging
+
+from asyncpg import exceptions
+from sqlalchemy.exc import SQLAlchemyError
+
+from app.db import db, Statement
+from app.metrics import SQL_LATENCY
+from app.utils.errors import DatabaseError
+
+
+LOGGER = logging.getLogger(__name__)
+
+
+class CategorySpending:
+    """Class that provides methods to work with running monthly category spending totals."""
+
+    TABLE_LOCK_ID = 5010
+    LOCK_TABLE_CREATION = db.text("""
+        SELECT pg_advisory_xact_lock(:lock_id);
+    """)
+    SELECT_AMOUNT_TYPE = db.text("""
+        SELECT data_type
+        FROM information_schema.columns
+        WHERE table_schema = current_schema()
+            and table_name = 'category_spending'
+            and column_name = 'amount'
+    """)
+    CREATE_TABLE = db.text("""
+        CREATE TABLE category_spending (
+            user_id integer NOT NULL,
+            category_id integer NOT NULL,
+            month date NOT NULL,
+            amount double precision NOT NULL DEFAULT 0,
+            PRIMARY KEY (user_id, category_id, month)
+        );
+    """)
+    ALTER_AMOUNT_TYPE = db.text("""
+        ALTER TABLE category_spending ALTER COLUMN amount TYPE double precision;
+    """)
+    SELECT_SPENDING = Statement("select_spending", """
+        SELECT amount
+        FROM category_spending
+        WHERE user_id = :user_id
+            and category_id = :category_id
+            and month = :month
+    """)
+    LOCK_SPENDING = db.text("""
+        LOCK TABLE category_spending IN EXCLUSIVE MODE;
+    """)
+    DELETE_SPENDING = db.text("""
+        DELETE FROM category_spending;
+    """)
+    REBUILD_SPENDING = db.text("""
+        INSERT INTO category_spending (user_id, category_id, month, amount)
+        SELECT transaction.user_id, mcc.category_id, date_trunc('month', timestamp), abs(sum(amount))
+        FROM transaction
+        JOIN mcc on transaction.mcc=mcc.code
+        WHERE amount < 0 and mcc.category_id IS NOT NULL
+        GROUP BY transaction.user_id, mcc.category_id, date_trunc('month', timestamp);
+    """)
+
+    @classmethod
+    async def create_table(cls):
+        """
+        Create spending totals table filled from existing transactions if it does not exist yet.
+        Amounts are stored as double precision like transaction and limit amounts, table created
+        with numeric amounts is converted.
+        """
+        try:
+            async with db.transaction():
+                await db.status(cls.LOCK_TABLE_CREATION, lock_id=cls.TABLE_LOCK_ID)
+                amount_type = await db.scalar(cls.SELECT_AMOUNT_TYPE)
+                if amount_type is None:
+                    await db.status(cls.CREATE_TABLE)
+                    await db.status(cls.REBUILD_SPENDING)
+                    LOGGER.info("Category spending table was created and filled from existing transactions.")
+                elif amount_type == "numeric":
+                    await db.status(cls.ALTER_AMOUNT_TYPE)
+        except (SQLAlchemyError, exceptions.PostgresError) as err:
+            LOGGER.error("Could not create category spending table. Error: %s", err)
+            raise DatabaseError("Failure. Failed to create category spending table.")
+
+    @classmethod
+    async def get_amount(cls, user_id, category_id, month):
+        """Retrieve category spending amount for provided month."""
+        try:
+            with SQL_LATENCY.time("select_spending"):
+                amount = await cls.SELECT_SPENDING.scalar(
+                    user_id=user_id,
+                    category_id=category_id,
+                    month=month
+                )
+        except (SQLAlchemyError, exceptions.PostgresError) as err:
+            LOGGER.error("Could not retrieve category=%s spending amount. Error: %s", category_id, err)
+            raise DatabaseError(f"Failure. Failed to retrieve category={category_id} spending amount.")
+
+        return amount or 0
+
+    @classmethod
+    async def rebuild(cls):
+        """Recompute all monthly category totals from transaction table."""
+        try:
+            async with db.transaction():
+                await db.status(cls.LOCK_SPENDING)
+                await db.status(cls.DELETE_SPENDING)
+                await db.status(cls.REBUILD_SPENDING)
+        except (SQLAlchemyError, exceptions.PostgresError) as err:
+            LOGGER.error("Could not rebuild category spending totals. Error: %s", err)
+            raise DatabaseError("Failure. Failed to rebuild category spending totals.")
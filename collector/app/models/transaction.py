@@ -6,8 +6,12 @@ from datetime import datetime
 from asyncpg import exceptions
 from sqlalchemy.exc import SQLAlchemyError
 
-from app.db import db
-from app.utils.errors import DatabaseError
+from app import config
+from app.db import db, Statement
+from app.metrics import SQL_LATENCY
+from app.models.outbox import NotificationOutbox
+from app.utils.batch import BatchWriter
+from app.utils.errors import DatabaseError, DuplicateError
 
 
 LOGGER = logging.getLogger(__name__)
@@ -16,57 +20,269 @@ LOGGER = logging.getLogger(__name__)
 class Transaction:
     """Class that provides methods to work with Transaction data."""
 
-    CREATE_TRANSACTION = db.text("""
-        INSERT INTO transaction (id, user_id, amount, balance, cashback, mcc, timestamp, info)
-        VALUES (:id, :user_id, :amount, :balance, :cashback, :mcc, :timestamp, :info);
+    INGEST_TRANSACTION = Statement("ingest_transaction", """
+        WITH inserted AS (
+            INSERT INTO transaction (id, user_id, amount, balance, cashback, mcc, timestamp, info)
+            VALUES (:id, :user_id, :amount, :balance, :cashback, :mcc, :timestamp, :info)
+            RETURNING user_id, amount, mcc, timestamp
+        ), spending AS (
+            INSERT INTO category_spending (user_id, category_id, month, amount)
+            SELECT inserted.user_id, mcc.category_id, date_trunc('month', inserted.timestamp), abs(inserted.amount)
+            FROM inserted
+            JOIN mcc on inserted.mcc=mcc.code
+            WHERE inserted.amount < 0 and mcc.category_id IS NOT NULL
+            ON CONFLICT (user_id, category_id, month)
+            DO UPDATE SET amount = category_spending.amount + excluded.amount
+            RETURNING category_id, amount
+        )
+        SELECT "user".telegram_id,
+            "user".notifications_enabled,
+            mcc_category.name as category_name,
+            budget_limit.amount as limit_amount,
+            spending.amount as spending_amount
+        FROM inserted
+        LEFT JOIN "user" on "user".id=inserted.user_id
+        LEFT JOIN spending on true
+        LEFT JOIN "mcc_category" on mcc_category.id=spending.category_id
+        LEFT JOIN "limit" as budget_limit
+            on budget_limit.user_id=inserted.user_id and budget_limit.category_id=spending.category_id
     """)
-    SELECT_CATEGORY_TRANSACTIONS_AMOUNT = db.text("""
-        SELECT abs(sum(amount))
-        FROM transaction
-        JOIN mcc on transaction.mcc=mcc.code
-        JOIN mcc_category on mcc.category_id=mcc_category.id
-        WHERE timestamp between :start_date and :end_date
-            and transaction.user_id = :user_id
-            and mcc.category_id= :category_id
-            and amount < 0
+    CREATE_TRANSACTIONS = Statement("create_transactions", """
+        WITH inserted AS (
+            INSERT INTO transaction (id, user_id, amount, balance, cashback, mcc, timestamp, info)
+            SELECT * FROM unnest(
+                CAST(:ids AS text[]),
+                CAST(:user_ids AS integer[]),
+                CAST(:amounts AS float8[]),
+                CAST(:balances AS float8[]),
+                CAST(:cashbacks AS float8[]),
+                CAST(:mccs AS integer[]),
+                CAST(:timestamps AS timestamp[]),
+                CAST(:infos AS text[])
+            )
+            ON CONFLICT DO NOTHING
+            RETURNING id, user_id, amount, mcc, timestamp
+        ), spending AS (
+            INSERT INTO category_spending (user_id, category_id, month, amount)
+            SELECT inserted.user_id, mcc.category_id, date_trunc('month', inserted.timestamp), abs(sum(inserted.amount))
+            FROM inserted
+            JOIN mcc on inserted.mcc=mcc.code
+            WHERE inserted.amount < 0 and mcc.category_id IS NOT NULL
+            GROUP BY inserted.user_id, mcc.category_id, date_trunc('month', inserted.timestamp)
+            ON CONFLICT (user_id, category_id, month)
+            DO UPDATE SET amount = category_spending.amount + excluded.amount
+            RETURNING user_id, category_id, month, amount
+        )
+        SELECT inserted.id,
+            "user".telegram_id,
+            "user".notifications_enabled,
+            mcc_category.name as category_name,
+            budget_limit.amount as limit_amount,
+            spending.amount as spending_amount
+        FROM inserted
+        LEFT JOIN "user" on "user".id=inserted.user_id
+        LEFT JOIN mcc on mcc.code=inserted.mcc
+        LEFT JOIN spending
+            on inserted.amount < 0
+            and spending.user_id=inserted.user_id
+            and spending.category_id=mcc.category_id
+            and spending.month=date_trunc('month', inserted.timestamp)
+        LEFT JOIN "mcc_category" on mcc_category.id=spending.category_id
+        LEFT JOIN "limit" as budget_limit
+            on budget_limit.user_id=inserted.user_id and budget_limit.category_id=spending.category_id
+    """)
+    CREATE_IMPORT_TABLE = db.text("""
+        CREATE TEMP TABLE transaction_import (LIKE transaction INCLUDING DEFAULTS) ON COMMIT DROP;
+    """)
+    MERGE_IMPORT_TABLE = db.text("""
+        WITH inserted AS (
+            INSERT INTO transaction (id, user_id, amount, balance, cashback, mcc, timestamp, info)
+            SELECT DISTINCT ON (id) id, user_id, amount, balance, cashback, mcc, timestamp, info
+            FROM transaction_import
+            ON CONFLICT DO NOTHING
+            RETURNING user_id, amount, mcc, timestamp
+        ), spending AS (
+            INSERT INTO category_spending (user_id, category_id, month, amount)
+            SELECT inserted.user_id, mcc.category_id, date_trunc('month', inserted.timestamp), abs(sum(inserted.amount))
+            FROM inserted
+            JOIN mcc on inserted.mcc=mcc.code
+            WHERE inserted.amount < 0 and mcc.category_id IS NOT NULL
+            GROUP BY inserted.user_id, mcc.category_id, date_trunc('month', inserted.timestamp)
+            ON CONFLICT (user_id, category_id, month)
+            DO UPDATE SET amount = category_spending.amount + excluded.amount
+        )
+        SELECT count(*) FROM inserted;
     """)
+    IMPORT_COLUMNS = ("id", "user_id", "amount", "balance", "cashback", "mcc", "timestamp", "info")
 
     @classmethod
     async def create_transaction(cls, user_id, mcc, transaction):
-        """Insert transaction element to postgres initially formatting it."""
-        timestamp = datetime.fromtimestamp(transaction["timestamp"])
+        """
+        Insert transaction element to postgres initially formatting it.
+        Return notification context of user (telegram, category limit and month spending)
+        queried in the same round trip.
+        """
+        row = {
+            "user_id": user_id,
+            "mcc": mcc,
+            "timestamp": datetime.fromtimestamp(transaction["timestamp"]),
+            "transaction": transaction
+        }
+        if config.POSTGRES_BATCH_ENABLED:
+            return await transaction_writer.submit(row)
+
         try:
-            return await db.status(
-                cls.CREATE_TRANSACTION,
-                id=transaction["id"],
-                user_id=user_id,
-                amount=transaction["amount"],
-                balance=transaction["balance"],
-                cashback=transaction["cashback"],
-                mcc=mcc,
-                timestamp=timestamp,
-                info=transaction["info"]
-            )
+            with SQL_LATENCY.time("ingest_transaction"):
+                async with db.transaction():
+                    context = await cls.INGEST_TRANSACTION.first(
+                        id=transaction["id"],
+                        user_id=user_id,
+                        amount=transaction["amount"],
+                        balance=transaction["balance"],
+                        cashback=transaction["cashback"],
+                        mcc=mcc,
+                        timestamp=row["timestamp"],
+                        info=transaction["info"]
+                    )
+                    if context is None:
+                        # partitioned table skips rows with already claimed id instead of raising
+                        LOGGER.warning("The transaction=%s already exists.", transaction["id"])
+                        raise DuplicateError(f"Failure. The transaction={transaction['id']} already exists.")
+                    if config.NOTIFICATION_OUTBOX_ENABLED:
+                        await NotificationOutbox.add([row])
         except exceptions.UniqueViolationError:
-            LOGGER.error("The transaction already exists. Transaction: %s", transaction)
-            raise DatabaseError(f"Failure. The transaction={transaction['id']} already exists.")
-        except SQLAlchemyError as err:
-            LOGGER.error("Could not create transaction for user=%s: %s. Error: %s", user_id, transaction, err)
+            LOGGER.warning("The transaction=%s already exists.", transaction["id"])
+            raise DuplicateError(f"Failure. The transaction={transaction['id']} already exists.")
+        except (SQLAlchemyError, exceptions.PostgresError) as err:
+            LOGGER.error("Could not create transaction=%s for user=%s. Error: %s", transaction["id"], user_id, err)
             raise DatabaseError("Failure. Failed to create transaction.")
 
+        return context
+
     @classmethod
-    async def get_category_transactions_amount(cls, user_id, category_id, start_date, end_date):
-        """Retrieve category transaction amount for provided period of time."""
+    async def create_transactions(cls, rows):
+        """
+        Insert batch of transactions with single multi-row statement. If the batch fails
+        (e.g. one row violates foreign key), rows are inserted one by one, so only failed
+        rows get an error. Return result for each row: notification context of inserted row
+        (the same as single transaction ingest returns), otherwise DatabaseError.
+        """
+        unique_rows = {}
+        for row in rows:
+            unique_rows.setdefault(row["transaction"]["id"], row)
+
+        batch = list(unique_rows.values())
         try:
-            amount = await db.scalar(
-                cls.SELECT_CATEGORY_TRANSACTIONS_AMOUNT,
-                user_id=user_id,
-                category_id=category_id,
-                start_date=start_date,
-                end_date=end_date
+            with SQL_LATENCY.time("create_transactions"):
+                contexts = await cls._write_rows(batch)
+            failed_ids = set()
+        except (SQLAlchemyError, exceptions.PostgresError) as err:
+            LOGGER.error("Could not create batch of %s transactions, inserting them one by one. Error: %s",
+                         len(batch), err)
+            contexts, failed_ids = await cls._write_rows_separately(batch)
+
+        results = []
+        for row in rows:
+            transaction = row["transaction"]
+            is_unique = unique_rows.get(transaction["id"]) is row
+            if is_unique and transaction["id"] in contexts:
+                results.append(contexts[transaction["id"]])
+            elif is_unique and transaction["id"] in failed_ids:
+                results.append(DatabaseError("Failure. Failed to create transaction."))
+            else:
+                LOGGER.warning("The transaction=%s already exists.", transaction["id"])
+                results.append(DuplicateError(f"Failure. The transaction={transaction['id']} already exists."))
+
+        return results
+
+    @classmethod
+    async def _write_rows(cls, rows):
+        """
+        Insert rows with their spending and outbox entries in one transaction.
+        Return notification contexts of inserted rows by transaction id.
+        """
+        async with db.transaction():
+            inserted = await cls._insert_batch(rows)
+            contexts = {context.id: context for context in inserted}
+            if config.NOTIFICATION_OUTBOX_ENABLED:
+                await NotificationOutbox.add([row for row in rows if row["transaction"]["id"] in contexts])
+
+        return contexts
+
+    @classmethod
+    async def _write_rows_separately(cls, rows):
+        """Insert each row in its own transaction. Return contexts of inserted rows and ids of failed ones."""
+        contexts, failed_ids = {}, set()
+        for row in rows:
+            transaction_id = row["transaction"]["id"]
+            try:
+                with SQL_LATENCY.time("create_transaction"):
+                    contexts.update(await cls._write_rows([row]))
+            except (SQLAlchemyError, exceptions.PostgresError) as err:
+                LOGGER.error("Could not create transaction=%s for user=%s. Error: %s",
+                             transaction_id, row["user_id"], err)
+                failed_ids.add(transaction_id)
+
+        return contexts, failed_ids
+
+    @classmethod
+    async def _insert_batch(cls, batch):
+        """Insert batch rows skipping existing ones and return notification contexts of inserted ones."""
+        return await cls.CREATE_TRANSACTIONS.all(
+            ids=[row["transaction"]["id"] for row in batch],
+            user_ids=[row["user_id"] for row in batch],
+            amounts=[row["transaction"]["amount"] for row in batch],
+            balances=[row["transaction"]["balance"] for row in batch],
+            cashbacks=[row["transaction"]["cashback"] for row in batch],
+            mccs=[row["mcc"] for row in batch],
+            timestamps=[row["timestamp"] for row in batch],
+            infos=[row["transaction"]["info"] for row in batch]
+        )
+
+    @classmethod
+    async def import_transactions(cls, rows):
+        """
+        Copy chunk of historical transaction rows to staging table and move them to
+        transaction table skipping existing ones. Return count of inserted transactions.
+        """
+        try:
+            with SQL_LATENCY.time("import_transactions"):
+                async with db.transaction():
+                    await db.status(cls.CREATE_IMPORT_TABLE)
+                    async with db.acquire(reuse=True) as conn:
+                        raw_conn = await conn.get_raw_connection()
+                        await raw_conn.copy_records_to_table(
+                            "transaction_import",
+                            records=cls._make_import_records(rows),
+                            columns=cls.IMPORT_COLUMNS
+                        )
+                    inserted = await db.scalar(cls.MERGE_IMPORT_TABLE)
+        except (SQLAlchemyError, exceptions.PostgresError) as err:
+            LOGGER.error("Could not import chunk of %s transactions. Error: %s", len(rows), err)
+            raise DatabaseError("Failure. Failed to import transactions.")
+
+        return inserted
+
+    @staticmethod
+    def _make_import_records(rows):
+        """Return rows as tuples in order of import columns."""
+        return [
+            (
+                row["transaction"]["id"],
+                row["user_id"],
+                row["transaction"]["amount"],
+                row["transaction"]["balance"],
+                row["transaction"]["cashback"],
+                row["mcc"],
+                row["timestamp"],
+                row["transaction"]["info"]
             )
-        except SQLAlchemyError as err:
-            LOGGER.error("Could not retrieve category=%s transaction amount. Error: %s", category_id, err)
-            raise DatabaseError(f"Failure. Failed to retrieve category={category_id} transaction amount.")
+            for row in rows
+        ]
+
 
-        return amount
+transaction_writer = BatchWriter(
+    write=Transaction.create_transactions,
+    batch_size=config.POSTGRES_BATCH_SIZE,
+    max_latency=config.POSTGRES_BATCH_MAX_LATENCY / 1000
+)
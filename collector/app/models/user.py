@@ -1,59 +1,176 @@
 """Module that includes functionality to work with user data."""
 
 import logging
+from functools import partial
+from collections import namedtuple
 
+from asyncpg import PostgresError
 from gino import exceptions
 from sqlalchemy.exc import SQLAlchemyError
 
-from app.db import db
+from app import config
+from app.db import db, Statement
+from app.cache import TieredCache
+from app.metrics import SQL_LATENCY
+from app.models.mcc import MCC
 from app.utils.errors import DatabaseError
 
 
 LOGGER = logging.getLogger(__name__)
 
+# cached records are plain module level tuples so they can be pickled to redis
+UserProfile = namedtuple("UserProfile", ("id", "telegram_id", "notifications_enabled"))
+UserLimit = namedtuple("UserLimit", ("category_id", "category_name", "amount"))
+
+
+def make_profile(user):
+    """Return cacheable user profile from queried record."""
+    return UserProfile(user["id"], user["telegram_id"], user["notifications_enabled"])
+
+
+def make_limit(limit):
+    """Return cacheable user limit from queried record."""
+    return UserLimit(limit["category_id"], limit["category_name"], limit["amount"])
+
+
+def get_limits_ttl(limits):
+    """Return ttl of user limits, users without any limit are cached for shorter period."""
+    return config.USER_CACHE_TTL if limits else config.USER_CACHE_NEGATIVE_TTL
+
 
 class User:
     """Class that provides methods to work with User data."""
 
-    SELECT_USER = db.text("""
-        SELECT *
+    SELECT_USER = Statement("select_user", """
+        SELECT id, telegram_id, notifications_enabled
         FROM "user"
         WHERE id = :user_id
     """)
-    SELECT_LIMIT = db.text("""
+    SELECT_LIMITS = Statement("select_limits", """
         SELECT mcc_category.id as category_id,
             mcc_category.name as category_name,
             budget_limit.amount
-        FROM mcc
-        LEFT JOIN "mcc_category" on mcc.category_id=mcc_category.id
-        LEFT JOIN "limit" as budget_limit on mcc_category.id=budget_limit.category_id
-        WHERE budget_limit.user_id = :user_id and mcc.code = :mcc_code
+        FROM "limit" as budget_limit
+        JOIN "mcc_category" on mcc_category.id=budget_limit.category_id
+        WHERE budget_limit.user_id = :user_id
+    """)
+
+    SELECT_USERS = db.text("""
+        SELECT id, telegram_id, notifications_enabled
+        FROM "user"
+        WHERE id = ANY(CAST(:user_ids AS integer[]))
+    """)
+    SELECT_USERS_LIMITS = db.text("""
+        SELECT budget_limit.user_id,
+            mcc_category.id as category_id,
+            mcc_category.name as category_name,
+            budget_limit.amount
+        FROM "limit" as budget_limit
+        JOIN "mcc_category" on mcc_category.id=budget_limit.category_id
+        WHERE budget_limit.user_id = ANY(CAST(:user_ids AS integer[]))
     """)
+    SELECT_ACTIVE_USERS = db.text("""
+        SELECT user_id
+        FROM category_spending
+        WHERE month >= date_trunc('month', now()) - interval '1 month'
+        GROUP BY user_id
+        ORDER BY max(month) DESC
+        LIMIT :limit
+    """)
+
+    profiles = TieredCache(
+        "user-profile",
+        maxsize=config.USER_CACHE_SIZE,
+        ttl=config.USER_CACHE_TTL,
+        stale_ttl=config.USER_CACHE_STALE_TTL
+    )
+    limits = TieredCache(
+        "user-limits",
+        maxsize=config.USER_CACHE_SIZE,
+        ttl=config.USER_CACHE_TTL,
+        stale_ttl=config.USER_CACHE_STALE_TTL
+    )
 
     @classmethod
     async def get(cls, user_id):
         """Return queried user record by provided id."""
+        return await cls.profiles.get(str(user_id), partial(cls._load_profile, user_id))
+
+    @classmethod
+    async def _load_profile(cls, user_id):
+        """Query user record by provided id."""
         try:
-            user = await db.one(cls.SELECT_USER, user_id=user_id)
+            with SQL_LATENCY.time("select_user"):
+                user = await cls.SELECT_USER.one(user_id=user_id)
         except exceptions.NoResultFound:
             LOGGER.error("Could not find user=%s.", user_id)
             raise DatabaseError
-        except SQLAlchemyError as err:
+        except (SQLAlchemyError, PostgresError) as err:
             LOGGER.error("Failed to fetch user=%s. Error: %s", user_id, err)
             raise DatabaseError
 
-        return user
+        return make_profile(user)
 
     @classmethod
-    async def get_limit(cls, user_id, mcc_code):
-        """Return queried user`s limit by provided mcc code."""
+    async def get_limits(cls, user_id):
+        """Return user`s limits mapped by category id."""
+        return await cls.limits.get(str(user_id), partial(cls._load_limits, user_id), ttl=get_limits_ttl)
+
+    @classmethod
+    async def _load_limits(cls, user_id):
+        """Query user`s limits mapped by category id."""
         try:
-            limit = await db.one(cls.SELECT_LIMIT, user_id=user_id, mcc_code=mcc_code)
-        except exceptions.NoResultFound:
-            LOGGER.error("Could not find limit by mcc code=%s for user=%s.", mcc_code, user_id)
+            with SQL_LATENCY.time("select_limits"):
+                limits = await cls.SELECT_LIMITS.all(user_id=user_id)
+        except (SQLAlchemyError, PostgresError) as err:
+            LOGGER.error("Failed to fetch limits for user=%s. Error: %s", user_id, err)
             raise DatabaseError
-        except SQLAlchemyError as err:
-            LOGGER.error("Failed to fetch limit by mcc code=% for user=%s. Error: %s", mcc_code, user_id, err)
+
+        return {limit.category_id: make_limit(limit) for limit in limits}
+
+    @classmethod
+    async def get_limit(cls, user_id, mcc_code):
+        """Return user`s limit by provided mcc code."""
+        limits = await cls.get_limits(user_id)
+        limit = limits.get(MCC.get_category_id(mcc_code))
+        if limit is None:
+            LOGGER.error("Could not find limit by mcc code=%s for user=%s.", mcc_code, user_id)
             raise DatabaseError
 
         return limit
+
+    @classmethod
+    async def get_active_ids(cls, limit):
+        """Return ids of users who spent money in current or previous month."""
+        try:
+            return [user.user_id for user in await db.all(cls.SELECT_ACTIVE_USERS, limit=limit)]
+        except (SQLAlchemyError, PostgresError) as err:
+            LOGGER.error("Failed to fetch active users. Error: %s", err)
+            raise DatabaseError
+
+    @classmethod
+    async def prime(cls, user_ids):
+        """Load profiles and limits of users into cache with two queries."""
+        try:
+            with SQL_LATENCY.time("select_users"):
+                users = await db.all(cls.SELECT_USERS, user_ids=user_ids)
+            with SQL_LATENCY.time("select_users_limits"):
+                users_limits = await db.all(cls.SELECT_USERS_LIMITS, user_ids=user_ids)
+        except (SQLAlchemyError, PostgresError) as err:
+            LOGGER.error("Failed to prime cache for %s users. Error: %s", len(user_ids), err)
+            raise DatabaseError
+
+        limits = {str(user.id): {} for user in users}
+        for limit in users_limits:
+            limits.setdefault(str(limit.user_id), {})[limit.category_id] = make_limit(limit)
+
+        await cls.profiles.set_many({str(user.id): make_profile(user) for user in users})
+        await cls.limits.set_many(limits, ttl=get_limits_ttl)
+        return len(users)
+
+    @classmethod
+    async def invalidate(cls, user_id):
+        """Drop cached user profile and limits after user settings were changed."""
+        await cls.profiles.delete(str(user_id))
+        await cls.limits.delete(str(user_id))
+        LOGGER.debug("Cached data for user=%s was invalidated.", user_id)
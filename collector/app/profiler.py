@@ -0,0 +1,126 @@
+"""This module provides on-demand sampling profiler of event loop thread."""
+
+import os
+import sys
+import time
+import asyncio
+import threading
+from collections import Counter, namedtuple
+
+from aiohttp import web
+
+
+NO_ROUTE = "-"
+MIN_INTERVAL = 0.001  # seconds, shorter interval makes sampler thread compete with loop for GIL
+
+# state shared between profiled loop and sampler thread
+SamplingSession = namedtuple(
+    "SamplingSession",
+    ("loop", "thread_id", "interval", "slow_threshold", "stop_event", "stacks", "slow_stacks")
+)
+
+
+class SamplingProfiler:
+    """
+    Class that periodically samples stack of event loop thread from a separate thread.
+
+    Samples are tagged with route of the request being handled, so time can be
+    split by path. Loop lag is measured by a ticking task, and stacks sampled
+    while the loop did not tick for longer than slow threshold are reported as
+    slow callbacks.
+    """
+
+    def __init__(self):
+        """Prepare inactive profiler state."""
+        self.active = False
+        self.routes = {}
+        self._heartbeat = 0
+
+    async def profile(self, seconds, interval, slow_threshold):
+        """Sample event loop thread during provided seconds and return report."""
+        self.active = True
+        loop = asyncio.get_running_loop()
+        session = SamplingSession(
+            loop=loop,
+            thread_id=threading.get_ident(),
+            interval=interval,
+            slow_threshold=slow_threshold,
+            stop_event=threading.Event(),
+            stacks=Counter(),
+            slow_stacks=Counter()
+        )
+        stacks, slow_stacks, lags = session.stacks, session.slow_stacks, []
+
+        self._heartbeat = time.perf_counter()
+        sampler = threading.Thread(target=self._sample, args=(session,), daemon=True)
+        sampler.start()
+        try:
+            deadline = time.perf_counter() + seconds
+            while time.perf_counter() < deadline:
+                expected = time.perf_counter() + interval
+                await asyncio.sleep(interval)
+                self._heartbeat = time.perf_counter()
+                lags.append(max(self._heartbeat - expected, 0))
+        finally:
+            session.stop_event.set()
+            await loop.run_in_executor(None, sampler.join)
+            self.active = False
+            self.routes.clear()
+
+        lags.sort()
+        return {
+            "pid": os.getpid(),
+            "seconds": seconds,
+            "interval": interval,
+            "samples": sum(stacks.values()),
+            "collapsed": "\n".join(f"{stack} {count}" for stack, count in stacks.most_common()),
+            "loop_lag_ms": {
+                "mean": sum(lags) / len(lags) * 1000 if lags else None,
+                "p50": lags[len(lags) // 2] * 1000 if lags else None,
+                "p99": lags[int(len(lags) * 0.99)] * 1000 if lags else None,
+                "max": lags[-1] * 1000 if lags else None
+            },
+            "slow_callbacks": [
+                {"stack": stack, "blocked_ms": count * interval * 1000}
+                for stack, count in slow_stacks.most_common()
+            ]
+        }
+
+    def _sample(self, session):
+        """Collect collapsed stacks of loop thread until stop event is set."""
+        while not session.stop_event.wait(session.interval):
+            frame = sys._current_frames().get(session.thread_id)  # pylint: disable=protected-access
+            if frame is None:
+                continue
+
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                frame = frame.f_back
+
+            task = asyncio.current_task(session.loop)
+            route = self.routes.get(task, NO_ROUTE) if task is not None else NO_ROUTE
+            collapsed = ";".join([route] + stack[::-1])
+            session.stacks[collapsed] += 1
+
+            if time.perf_counter() - self._heartbeat > session.slow_threshold:
+                session.slow_stacks[collapsed] += 1
+
+
+profiler = SamplingProfiler()
+
+
+@web.middleware
+async def profiler_middleware(request, handler):
+    """Tag request task with its route while profiler is active."""
+    if not profiler.active:
+        return await handler(request)
+
+    task = asyncio.current_task()
+    resource = request.match_info.route.resource
+    profiler.routes[task] = resource.canonical if resource is not None else request.path
+    try:
+        return await handler(request)
+    finally:
+        profiler.routes.pop(task, None)
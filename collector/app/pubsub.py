@@ -0,0 +1,72 @@
+"""This module provides functionality for redis pub/sub interactions."""
+
+import asyncio
+import logging
+from contextlib import suppress
+
+import aioredis
+from aioredis.pubsub import Receiver
+
+from app import config
+
+
+LOGGER = logging.getLogger(__name__)
+
+
+class PubSub:
+    """Class that dispatches redis pub/sub messages to subscribed handlers."""
+
+    def __init__(self, url):
+        """Set redis url and prepare empty handlers registry."""
+        self.url = url
+        self._handlers = {}
+        self._task = None
+
+    def subscribe(self, channel, handler):
+        """Register coroutine handler for messages published to channel."""
+        self._handlers.setdefault(channel, []).append(handler)
+
+    async def start(self):
+        """Start listening to subscribed channels in background."""
+        if self._handlers and self._task is None:
+            self._task = asyncio.create_task(self._listen())
+
+    async def stop(self):
+        """Stop listening to subscribed channels."""
+        if self._task is None:
+            return
+
+        self._task.cancel()
+        with suppress(asyncio.CancelledError):
+            await self._task
+        self._task = None
+
+    async def _listen(self):
+        """Keep pub/sub connection alive and dispatch received messages."""
+        while True:
+            connection = None
+            try:
+                connection = await aioredis.create_redis(self.url)
+                receiver = Receiver()
+                await connection.subscribe(*[receiver.channel(channel) for channel in self._handlers])
+                async for channel, message in receiver.iter(encoding="utf-8"):
+                    await self._dispatch(channel.name.decode(), message)
+            except (aioredis.RedisError, OSError) as err:
+                LOGGER.error("Redis pub/sub connection was lost. Error: %s", err)
+            finally:
+                if connection is not None:
+                    connection.close()
+                    await connection.wait_closed()
+
+            await asyncio.sleep(config.REDIS_RETRY_INTERVAL)
+
+    async def _dispatch(self, channel, message):
+        """Pass received message to each handler subscribed to channel."""
+        for handler in self._handlers.get(channel, []):
+            try:
+                await handler(message)
+            except Exception as err:  # pylint: disable=broad-except
+                LOGGER.error("Failed to handle message from channel=%s. Error: %s", channel, err)
+
+
+pubsub = PubSub(config.REDIS_URL)
@@ -2,12 +2,16 @@
 
 import socketio
 
-from app.config import JWT_SECRET_KEY
+from app import config
+from app.sio_manager import RedisRoomManager
+from app.utils import codec
 from app.utils.jwt import decode_token
 from app.utils.errors import TokenError
+from app.utils.replay import transaction_events
 
 
-sio = socketio.AsyncServer(async_mode="aiohttp")
+sio_manager = RedisRoomManager() if config.SOCKETIO_MESSAGE_QUEUE == "redis" else None
+sio = socketio.AsyncServer(async_mode="aiohttp", client_manager=sio_manager, json=codec)
 
 
 class TransactionEvent(socketio.AsyncNamespace):
@@ -17,24 +21,37 @@ class TransactionEvent(socketio.AsyncNamespace):
 
     @classmethod
     async def on_subscribe(cls, sid, message):
-        """Event handler for transaction subscribing."""
+        """
+        Event handler for transaction subscribing. Transaction events with sequence id
+        greater than optional since cursor are replayed to the subscribed client.
+        """
         token = message.get("token", "").split("Bearer ")[-1]
         try:
-            payload = decode_token(token, JWT_SECRET_KEY)
+            payload = decode_token(token, config.JWT_SECRET_KEY)
         except TokenError:
             return
 
         user_id = payload["user_id"]
 
+        # room is entered before reading buffer so no event is missed between them,
+        # client should skip events with already seen sequence id
         sio.enter_room(sid, user_id, namespace=cls.namespace)
-        event_message = {"success": True}
-        await sio.emit("subscribed", event_message, room=user_id, namespace=cls.namespace)
+        since = message.get("since")
+        events, latest, complete = await transaction_events.get_since(
+            user_id, since if isinstance(since, int) else None
+        )
+        # complete is False when some of missed events are not in buffer anymore
+        # and client has to reload transactions
+        event_message = {"success": True, "seq": latest, "complete": complete}
+        await sio.emit("subscribed", event_message, room=sid, namespace=cls.namespace)
+        for event in events:
+            await sio.emit("new transaction", event, room=sid, namespace=cls.namespace)
 
     @classmethod
     async def emit_new_transaction(cls, user_id, transaction):
         """Emit new transaction event to client."""
         # TODO: consider if we need to put whole transaction dict or simple message will be enough
-        event_message = {"transaction": transaction}
+        event_message = await transaction_events.add(user_id, transaction)
         await sio.emit("new transaction", event_message, room=user_id, namespace=cls.namespace)
 
 
@@ -0,0 +1,261 @@
+"""This module provides socketio client manager shared across workers through redis."""
+
+import asyncio
+import logging
+
+import aioredis
+import socketio
+from socketio.asyncio_pubsub_manager import AsyncPubSubManager
+
+from app import config
+from app.cache import redis
+from app.utils import codec
+
+
+LOGGER = logging.getLogger(__name__)
+
+
+class RedisRoomManager(AsyncPubSubManager):  # pylint: disable=abstract-method
+    """
+    Class that routes socketio events to workers which hold target rooms.
+
+    Each worker indexes its rooms in redis sets and listens to its own channel,
+    so an emit to a room is published only to workers that hold the room.
+    Published messages and index updates are sent in short batches. Workers
+    refresh expiring heartbeat keys and remove rooms of workers that stopped
+    without cleanup (killed or crashed) from the index.
+    """
+
+    name = "redisroom"
+
+    def __init__(self, channel="socketio"):
+        """Prepare empty publish and room index batches."""
+        super().__init__(channel=channel)
+        self._messages = {}
+        self._index_updates = []
+        self._flush_handle = None
+        self._flushes = set()
+        self._heartbeat = None
+
+    @property
+    def host_channel(self):
+        """Return channel which receives messages addressed to this worker."""
+        return f"{self.channel}:{self.host_id}"
+
+    @property
+    def hosts_key(self):
+        """Return redis key of set with workers that have indexed rooms."""
+        return f"{self.channel}-hosts"
+
+    def get_room_key(self, namespace, room):
+        """Return redis key of set with workers that hold the room."""
+        return f"{self.channel}-room:{namespace}:{room}"
+
+    def get_host_key(self, host_id):
+        """Return redis key that exists while worker is alive."""
+        return f"{self.channel}-host:{host_id}"
+
+    def get_host_rooms_key(self, host_id):
+        """Return redis key of set with room keys indexed by worker."""
+        return f"{self.channel}-host-rooms:{host_id}"
+
+    def initialize(self):
+        """Skip listener thread of pub/sub manager (`_listen` is never called), messages come via app pub/sub."""
+        socketio.AsyncManager.initialize(self)
+
+    def enter_room(self, sid, namespace, room):
+        """Add client to room and index the room if it is new for this worker."""
+        is_new_room = room not in self.rooms.get(namespace, {})
+        super().enter_room(sid, namespace, room)
+        if is_new_room and room is not None and room != sid:
+            self._index_updates.append(("sadd", self.get_room_key(namespace, room)))
+            self._schedule_flush()
+
+    def leave_room(self, sid, namespace, room):
+        """Remove client from room and drop the room from index if it became empty."""
+        super().leave_room(sid, namespace, room)
+        if room is not None and room != sid and room not in self.rooms.get(namespace, {}):
+            self._index_updates.append(("srem", self.get_room_key(namespace, room)))
+            self._schedule_flush()
+
+    # signature of socketio manager emit
+    async def emit(self, event, data, namespace=None, room=None,  # pylint: disable=too-many-arguments
+                   skip_sid=None, callback=None, **kwargs):
+        """Emit event to local clients and publish it to workers that hold the room."""
+        namespace = namespace or "/"
+        if kwargs.get("ignore_queue") or callback is not None:
+            # acknowledgement callbacks are supported for local clients only
+            return await socketio.AsyncManager.emit(
+                self, event, data, namespace, room=room, skip_sid=skip_sid, callback=callback
+            )
+
+        message = {
+            "method": "emit",
+            "event": event,
+            "data": data,
+            "namespace": namespace,
+            "room": room,
+            "skip_sid": skip_sid,
+            "host_id": self.host_id
+        }
+        await socketio.AsyncManager.emit(self, event, data, namespace, room=room, skip_sid=skip_sid)
+        if room is None:
+            self._queue_message(self.channel, message)
+            return
+
+        if room in self.rooms.get(namespace, {}).get(room, ()):
+            # private room of local client is not indexed
+            return
+
+        try:
+            hosts = await redis.pool.smembers(self.get_room_key(namespace, room))
+        except (aioredis.RedisError, OSError) as err:
+            LOGGER.error("Failed to get workers of socketio room=%s. Error: %s", room, err)
+            return
+
+        for host_id in hosts:
+            if host_id != self.host_id:
+                self._queue_message(f"{self.channel}:{host_id}", message)
+
+    async def close_room(self, room, namespace=None):
+        """Close room for local clients and ask other workers to close it as well."""
+        namespace = namespace or "/"
+        await socketio.AsyncManager.close_room(self, room, namespace)
+        await self._publish({"method": "close_room", "room": room, "namespace": namespace})
+
+    async def handle_messages(self, payload):
+        """Handle batch of messages published by other workers."""
+        for message in codec.loads(payload):
+            if message.get("host_id") == self.host_id:
+                continue
+
+            method = message.get("method")
+            if method == "emit":
+                await self._handle_emit(message)
+            elif method == "disconnect":
+                await self._handle_disconnect(message)
+            elif method == "close_room":
+                await self._handle_close_room(message)
+
+    async def start(self):
+        """Start refreshing heartbeat of this worker and pruning rooms of dead workers."""
+        self._heartbeat = asyncio.create_task(self._watch_hosts())
+
+    async def close(self):
+        """Remove this worker from room index and send pending batches."""
+        if self._heartbeat is not None:
+            self._heartbeat.cancel()
+            await asyncio.gather(self._heartbeat, return_exceptions=True)
+            self._heartbeat = None
+
+        for namespace, rooms in self.rooms.items():
+            for room, participants in rooms.items():
+                # skip namespace room and private rooms named by client sid
+                if room is not None and room not in participants:
+                    self._index_updates.append(("srem", self.get_room_key(namespace, room)))
+
+        self._flush()
+        if self._flushes:
+            await asyncio.gather(*self._flushes, return_exceptions=True)
+
+        try:
+            await self._remove_host(self.host_id)
+        except (aioredis.RedisError, OSError) as err:
+            LOGGER.error("Failed to remove socketio worker from room index. Error: %s", err)
+
+    async def _watch_hosts(self):
+        """Periodically refresh heartbeat key of this worker and prune dead workers."""
+        while True:
+            try:
+                await self._beat()
+                await self._prune_hosts()
+            except (aioredis.RedisError, OSError) as err:
+                LOGGER.error("Failed to refresh socketio workers index. Error: %s", err)
+
+            await asyncio.sleep(config.SOCKETIO_HOST_TTL / 3)
+
+    async def _beat(self):
+        """Refresh heartbeat key of this worker."""
+        pipeline = redis.pool.pipeline()
+        pipeline.setex(self.get_host_key(self.host_id), config.SOCKETIO_HOST_TTL, 1)
+        pipeline.sadd(self.hosts_key, self.host_id)
+        await pipeline.execute()
+
+    async def _prune_hosts(self):
+        """Remove workers whose heartbeat key has expired from room index. Return their ids."""
+        hosts = [host_id for host_id in await redis.pool.smembers(self.hosts_key) if host_id != self.host_id]
+        if not hosts:
+            return []
+
+        pipeline = redis.pool.pipeline()
+        for host_id in hosts:
+            pipeline.exists(self.get_host_key(host_id))
+        alive = await pipeline.execute()
+
+        dead_hosts = [host_id for host_id, is_alive in zip(hosts, alive) if not is_alive]
+        for host_id in dead_hosts:
+            await self._remove_host(host_id)
+            LOGGER.warning("Socketio rooms of stopped worker=%s were removed from index.", host_id)
+
+        return dead_hosts
+
+    async def _remove_host(self, host_id):
+        """Remove worker from every room it has indexed and drop its keys."""
+        host_rooms_key = self.get_host_rooms_key(host_id)
+        room_keys = await redis.pool.smembers(host_rooms_key)
+        pipeline = redis.pool.pipeline()
+        for room_key in room_keys:
+            pipeline.srem(room_key, host_id)
+        pipeline.delete(host_rooms_key, self.get_host_key(host_id))
+        pipeline.srem(self.hosts_key, host_id)
+        await pipeline.execute()
+
+    async def _publish(self, data):
+        """Publish message to all workers."""
+        data["host_id"] = self.host_id
+        self._queue_message(self.channel, data)
+
+    def _queue_message(self, channel, message):
+        """Add message to publish batch of channel."""
+        self._messages.setdefault(channel, []).append(message)
+        if sum(len(messages) for messages in self._messages.values()) >= config.SOCKETIO_PUBLISH_BATCH_SIZE:
+            self._flush()
+        else:
+            self._schedule_flush()
+
+    def _schedule_flush(self):
+        """Schedule sending of current batches if it was not scheduled yet."""
+        if self._flush_handle is None:
+            self._flush_handle = asyncio.get_running_loop().call_later(
+                config.SOCKETIO_PUBLISH_INTERVAL / 1000, self._flush
+            )
+
+    def _flush(self):
+        """Start sending current batches with single redis pipeline."""
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+
+        messages, self._messages = self._messages, {}
+        index_updates, self._index_updates = self._index_updates, []
+        if not messages and not index_updates:
+            return
+
+        task = asyncio.create_task(self._send(messages, index_updates))
+        self._flushes.add(task)
+        task.add_done_callback(self._flushes.discard)
+
+    async def _send(self, messages, index_updates):
+        """Send room index updates and published messages to redis."""
+        pipeline = redis.pool.pipeline()
+        host_rooms_key = self.get_host_rooms_key(self.host_id)
+        for command, room_key in index_updates:
+            getattr(pipeline, command)(room_key, self.host_id)
+            getattr(pipeline, command)(host_rooms_key, room_key)
+        for channel, channel_messages in messages.items():
+            pipeline.publish(channel, codec.dumps(channel_messages))
+
+        try:
+            await pipeline.execute()
+        except (aioredis.RedisError, OSError) as err:
+            LOGGER.error("Failed to publish socketio messages. Error: %s", err)
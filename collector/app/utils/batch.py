@@ -0,0 +1,82 @@
+"""This module provides functionality for grouping concurrent writes."""
+
+import asyncio
+import logging
+
+
+LOGGER = logging.getLogger(__name__)
+
+
+class BatchWriter:
+    """
+    Class that collects concurrently submitted items and writes them at once.
+
+    A batch is written when it reaches batch size or when max latency passes
+    since the first item of the batch was submitted. The write callback receives
+    a list of items and returns a list of results of the same order, where a
+    result may be an exception instance to be raised for its submitter only.
+    """
+
+    def __init__(self, write, batch_size, max_latency):
+        """Set write callback and batching limits (max latency in seconds)."""
+        self._write = write
+        self.batch_size = batch_size
+        self.max_latency = max_latency
+        self._pending = []
+        self._timer = None
+        self._writes = set()
+
+    async def submit(self, item):
+        """Add item to current batch and wait until the batch is written."""
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((item, future))
+
+        if len(self._pending) >= self.batch_size:
+            self.flush()
+        elif self._timer is None:
+            self._timer = asyncio.get_running_loop().call_later(self.max_latency, self.flush)
+
+        return await future
+
+    def flush(self):
+        """Start writing of currently collected batch."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        batch, self._pending = self._pending, []
+        if not batch:
+            return
+
+        task = asyncio.create_task(self._write_batch(batch))
+        self._writes.add(task)
+        task.add_done_callback(self._writes.discard)
+
+    async def close(self):
+        """Write pending batch and wait for all started writes to finish."""
+        self.flush()
+        if self._writes:
+            await asyncio.gather(*self._writes, return_exceptions=True)
+
+    async def _write_batch(self, batch):
+        """Write batch and resolve each submitter with its own result."""
+        try:
+            results = await self._write([item for item, _ in batch])
+        except Exception as err:  # pylint: disable=broad-except
+            LOGGER.error("Failed to write batch of %s items. Error: %s", len(batch), err)
+            results = [err] * len(batch)
+
+        for (_, future), result in zip(batch, results):
+            if future.done():
+                continue
+
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+        missing = [future for _, future in batch[len(results):] if not future.done()]
+        if missing:
+            LOGGER.error("Write of batch of %s items returned only %s results.", len(batch), len(results))
+        for future in missing:
+            future.set_exception(RuntimeError("Failure. The item was not written."))
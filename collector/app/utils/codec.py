@@ -0,0 +1,41 @@
+"""This module provides json encoding and decoding using the fastest available library."""
+
+import json
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+try:
+    import ujson
+except ImportError:  # pragma: no cover
+    ujson = None
+
+
+# all supported libraries raise ValueError subclasses on malformed input
+DecodeError = ValueError
+
+
+def _orjson_dumps(obj, **kwargs):  # pylint: disable=unused-argument
+    """Serialize object to json string with orjson."""
+    return orjson.dumps(obj).decode()
+
+
+def _ujson_dumps(obj, **kwargs):  # pylint: disable=unused-argument
+    """Serialize object to json string with ujson."""
+    return ujson.dumps(obj, ensure_ascii=False)
+
+
+if orjson is not None:
+    NAME = "orjson"
+    dumps = _orjson_dumps
+    loads = orjson.loads
+elif ujson is not None:
+    NAME = "ujson"
+    dumps = _ujson_dumps
+    loads = ujson.loads
+else:
+    NAME = "json"
+    dumps = json.dumps
+    loads = json.loads
@@ -0,0 +1,48 @@
+"""This module provides functionality for detecting repeated monobank webhooks."""
+
+import logging
+
+import aioredis
+
+from app import config
+from app.cache import redis, LocalCache, TRANSACTION_SEEN_CACHE_KEY
+
+
+LOGGER = logging.getLogger(__name__)
+
+
+class RecentTransactions:
+    """Class that remembers recently stored transaction ids in worker memory and redis."""
+
+    def __init__(self):
+        """Prepare in-process cache of recently seen transaction ids."""
+        self.local = LocalCache(maxsize=config.DEDUP_CACHE_SIZE, ttl=config.DEDUP_TTL)
+
+    async def contains(self, transaction_id):
+        """Check if transaction was already stored by any worker."""
+        if self.local.get(transaction_id):
+            return True
+
+        try:
+            exists = await redis.pool.exists(TRANSACTION_SEEN_CACHE_KEY.format(transaction_id=transaction_id))
+        except (aioredis.RedisError, OSError) as err:
+            LOGGER.warning("Could not check transaction=%s in redis. Error: %s", transaction_id, err)
+            return False
+
+        if exists:
+            self.local.set(transaction_id, True)
+
+        return bool(exists)
+
+    async def add(self, transaction_id):
+        """Remember transaction as stored."""
+        self.local.set(transaction_id, True)
+        try:
+            await redis.pool.set(
+                TRANSACTION_SEEN_CACHE_KEY.format(transaction_id=transaction_id), 1, expire=config.DEDUP_TTL
+            )
+        except (aioredis.RedisError, OSError) as err:
+            LOGGER.warning("Could not remember transaction=%s in redis. Error: %s", transaction_id, err)
+
+
+recent_transactions = RecentTransactions()
@@ -11,3 +11,7 @@ class DatabaseError(BaseError):
 
 class TokenError(BaseError):
     """Class that represents errors caused on interaction with auth token."""
+
+
+class DuplicateError(DatabaseError):
+    """Class that represents errors caused by inserting already existing record."""
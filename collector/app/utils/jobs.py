@@ -0,0 +1,50 @@
+"""This module provides admission control for background jobs of web requests."""
+
+import time
+import asyncio
+import logging
+
+from aiojobs.aiohttp import get_scheduler, spawn
+
+from app import config
+from app.metrics import SHED_JOBS
+
+
+LOGGER = logging.getLogger(__name__)
+
+DRAIN_POLL_INTERVAL = 0.05  # seconds
+
+
+def get_jobs_stats(scheduler):
+    """Return count of active and pending jobs of scheduler with its limits."""
+    return {
+        "active": scheduler.active_count,
+        "pending": scheduler.pending_count,
+        "limit": scheduler.limit,
+        "pending_limit": scheduler.pending_limit
+    }
+
+
+async def spawn_optional(request, coro, job):
+    """
+    Spawn job that may be skipped without losing data (e.g. live socketio event).
+    The job is dropped if too many jobs are already waiting or application is shutting down.
+    """
+    scheduler = get_scheduler(request)
+    if scheduler.pending_count >= config.JOBS_SHED_PENDING or request.app.get("draining"):
+        coro.close()
+        SHED_JOBS.inc(job)
+        LOGGER.debug("The optional job=%s was dropped: %s jobs are pending.", job, scheduler.pending_count)
+        return None
+
+    return await spawn(request, coro)
+
+
+async def drain_jobs(scheduler, timeout):
+    """Wait until active and pending jobs are done or timeout is reached. Return count of unfinished jobs."""
+    deadline = time.monotonic() + timeout
+    while len(scheduler) > 0 and time.monotonic() < deadline:
+        # jobs are polled instead of awaited to keep scheduler exception handling of failed jobs
+        await asyncio.sleep(DRAIN_POLL_INTERVAL)
+
+    return len(scheduler)
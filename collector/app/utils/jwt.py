@@ -1,15 +1,50 @@
 """This module provides helper functionality with JWT."""
 
+import time
+import hashlib
+
 import jwt
 
+from app import config
+from app.cache import LocalCache
 from app.utils.errors import TokenError
 
 
+# verified payloads and rejection reasons keyed by digest of secret and token, rejections are
+# kept apart so a flood of bogus tokens cannot evict verified ones
+token_cache = LocalCache(maxsize=config.JWT_CACHE_SIZE, ttl=config.JWT_CACHE_TTL)
+rejected_token_cache = LocalCache(maxsize=config.JWT_NEGATIVE_CACHE_SIZE, ttl=config.JWT_NEGATIVE_CACHE_TTL)
+
+
+def get_token_digest(token, secret_key):
+    """Return digest that identifies token verified with secret key."""
+    return hashlib.sha256(f"{secret_key}.{token}".encode()).digest()
+
+
 def decode_token(token, secret_key):
     """Return decoded payload from json web token."""
+    token_digest = get_token_digest(token, secret_key)
+    cached = token_cache.get(token_digest)
+    if cached is not None:
+        return cached
+
+    rejection = rejected_token_cache.get(token_digest)
+    if rejection is not None:
+        raise TokenError(rejection)
+
     try:
-        return jwt.decode(token, secret_key)
+        payload = jwt.decode(token, secret_key)
     except jwt.DecodeError:
-        raise TokenError("The token is invalid.")
+        error = TokenError("The token is invalid.")
     except jwt.ExpiredSignatureError:
-        raise TokenError("The token has expired.")
+        error = TokenError("The token has expired.")
+    else:
+        ttl = config.JWT_CACHE_TTL
+        if "exp" in payload:
+            ttl = min(ttl, payload["exp"] - time.time())
+        if ttl > 0:
+            token_cache.set(token_digest, payload, ttl)
+        return payload
+
+    rejected_token_cache.set(token_digest, str(error))
+    raise error
@@ -0,0 +1,127 @@
+"""This module provides non-blocking logging helpers."""
+
+import os
+import time
+import queue
+import atexit
+import logging
+import threading
+from collections import OrderedDict
+from logging.handlers import QueueHandler, QueueListener
+
+from app.utils import codec
+
+
+class JsonFormatter(logging.Formatter):
+    """Format log records as single line json objects."""
+
+    def format(self, record):
+        """Return json representation of log record."""
+        entry = {
+            "timestamp": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "process": record.process
+        }
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        if getattr(record, "suppressed", 0):
+            entry["suppressed"] = record.suppressed
+
+        return codec.dumps(entry)
+
+
+class RateLimitFilter(logging.Filter):
+    """
+    Pass at most burst records of the same message template per interval.
+    The first record passed in the next interval reports count of suppressed ones.
+    Only templated records (with arguments) are limited, already formatted
+    messages such as access log lines are unique and passed as is. Windows are
+    kept for at most maxsize templates, the least recently logged are evicted.
+    """
+
+    def __init__(self, interval, burst, maxsize=1000):
+        """Set rate limit window in seconds, count of records passed per window and count of tracked templates."""
+        super().__init__()
+        self.interval = interval
+        self.burst = burst
+        self.maxsize = maxsize
+        self._windows = OrderedDict()
+        self._lock = threading.Lock()
+
+    def filter(self, record):
+        """Return False if record exceeded rate limit of its message template."""
+        if self.interval <= 0 or not record.args:
+            return True
+
+        key = (record.name, record.levelno, record.msg)
+        now = time.monotonic()
+        with self._lock:
+            started_at, passed, suppressed = self._windows.pop(key, (now, 0, 0))
+            if now - started_at >= self.interval:
+                started_at, passed = now, 0
+
+            self._evict(now)
+            if passed >= self.burst:
+                self._windows[key] = (started_at, passed, suppressed + 1)
+                return False
+
+            self._windows[key] = (started_at, passed + 1, 0)
+
+        if suppressed:
+            record.suppressed = suppressed
+            record.msg = f"{record.msg} ({suppressed} similar messages suppressed)"
+        return True
+
+    def _evict(self, now):
+        """Drop expired windows that were not logged recently and keep count of windows under maxsize."""
+        while self._windows:
+            started_at, _, suppressed = next(iter(self._windows.values()))
+            if len(self._windows) < self.maxsize and (suppressed or now - started_at < self.interval):
+                break
+            self._windows.popitem(last=False)
+
+
+class QueueLogging:
+    """Class that moves formatting output and writing of log records to background thread."""
+
+    def __init__(self):
+        """Prepare not started listener."""
+        self.listener = None
+        # listener thread is not copied to forked worker, so worker starts its own one
+        os.register_at_fork(after_in_child=self._forget_listener)
+
+    def _forget_listener(self):
+        """Forget listener of parent process."""
+        self.listener = None
+
+    def start(self, handlers, filters=()):
+        """Replace root logger handlers with queue handler served by listener thread."""
+        if self.listener is not None:
+            return
+
+        records = queue.SimpleQueue()
+        queue_handler = QueueHandler(records)
+        for log_filter in filters:
+            queue_handler.addFilter(log_filter)
+
+        root = logging.getLogger()
+        for handler in root.handlers[:]:
+            root.removeHandler(handler)
+        root.addHandler(queue_handler)
+
+        self.listener = QueueListener(records, *handlers, respect_handler_level=True)
+        self.listener.start()
+        atexit.register(self.stop)
+
+    def stop(self):
+        """Write queued records and stop listener thread."""
+        if self.listener is None:
+            return
+
+        self.listener.stop()
+        self.listener = None
+
+
+queue_logging = QueueLogging()
@@ -1,16 +1,19 @@
 """This module provides functionality for user notifications."""
 
 import asyncio
+import logging
 from datetime import datetime
 
-from aiohttp import ClientSession
-
+from app import config
+from app.metrics import STAGE_LATENCY
 from app.models.user import User
 from app.models.mcc import MCC
-from app.models.transaction import Transaction
+from app.models.spending import CategorySpending
 from app.utils.errors import DatabaseError
-from app.utils.telegram import send_notification
+from app.utils.telegram import telegram_client
+
 
+LOGGER = logging.getLogger(__name__)
 
 LIMIT_NOTIFICATION_TEXT = \
     "*Limit Exceeded!* ⛔️\n\n" \
@@ -24,15 +27,90 @@ TRANSACTION_NOTIFICATION_TEXT = \
     "▪️ Info: *{info}*\n" \
     "▪️ Balance: *{balance}*\n" \
     "▪ Timestamp: *{date}*"
-
-
-async def get_transaction_notification(transaction):
+DIGEST_NOTIFICATION_TEXT = "*{count} transactions* 💲\n\n{notifications}"
+
+
+class NotificationCoalescer:
+    """Merge notifications sent to the same chat within short window into single digest message."""
+
+    def __init__(self, window, max_items):
+        """Initialize empty pending digests."""
+        self.window = window
+        self.max_items = max_items
+        self._digests = {}
+        self._tasks = set()
+
+    @property
+    def enabled(self):
+        """Return True if notifications should be coalesced."""
+        return self.window > 0
+
+    def add(self, chat_id, text):
+        """Add notification to chat digest and return future resolved with digest delivery result."""
+        digest = self._digests.get(chat_id)
+        if digest is None:
+            loop = asyncio.get_running_loop()
+            digest = self._digests[chat_id] = {
+                "texts": [],
+                "future": loop.create_future(),
+                "timer": loop.call_later(self.window, self._flush, chat_id)
+            }
+
+        digest["texts"].append(text)
+        future = digest["future"]
+        if len(digest["texts"]) >= self.max_items:
+            self._flush(chat_id)
+
+        # waiter cancellation should not cancel delivery of the whole digest
+        return asyncio.shield(future)
+
+    def _flush(self, chat_id):
+        """Close window of chat digest and send it in background."""
+        digest = self._digests.pop(chat_id, None)
+        if digest is None:
+            return
+
+        digest["timer"].cancel()
+        task = asyncio.ensure_future(self._send(chat_id, digest))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    @staticmethod
+    async def _send(chat_id, digest):
+        """Send digest message and resolve its future."""
+        texts = digest["texts"]
+        if len(texts) == 1:
+            text = texts[0]
+        else:
+            text = DIGEST_NOTIFICATION_TEXT.format(count=len(texts), notifications="\n\n".join(texts))
+
+        delivered = False
+        try:
+            delivered = await telegram_client.send_message(chat_id, text)
+        finally:
+            if not digest["future"].done():
+                digest["future"].set_result(delivered)
+
+        LOGGER.debug("A digest of %s notifications was sent to chat=%s.", len(texts), chat_id)
+
+    async def close(self):
+        """Send all pending digests without waiting for their windows to close."""
+        for chat_id in list(self._digests):
+            self._flush(chat_id)
+
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+
+notification_coalescer = NotificationCoalescer(
+    window=config.TELEGRAM_COALESCE_WINDOW,
+    max_items=config.TELEGRAM_COALESCE_MAX_ITEMS
+)
+
+
+def get_transaction_notification(transaction):
     """Format a new transaction notification text."""
-    try:
-        category = await MCC.get_category(transaction["mcc"])
-    except DatabaseError:
-        category = "-"
-
+    category = MCC.get_category(transaction["mcc"])
     date = datetime.fromtimestamp(transaction["timestamp"]).strftime("%d.%m.%Y %H:%M:%S")
     notification = TRANSACTION_NOTIFICATION_TEXT.format(
         amount=transaction["amount"],
@@ -45,63 +123,83 @@ async def get_transaction_notification(transaction):
     return notification
 
 
+def format_limit_notification(category, limit_amount, spending_amount):
+    """Format limit exceeding notification text if spending reached the limit."""
+    if limit_amount is None or spending_amount is None or spending_amount < limit_amount:
+        return None
+
+    return LIMIT_NOTIFICATION_TEXT.format(
+        category=category,
+        limit=limit_amount,
+        amount=limit_amount - spending_amount
+    )
+
+
 async def get_limit_notification(user_id, mcc_code):
-    """Format limit exceeding notification text."""
+    """Query user limit and category spending to format limit exceeding notification text."""
     try:
         limit = await User.get_limit(user_id, mcc_code)
     except DatabaseError:
         return
 
-    end_date = datetime.now()
-    start_date = end_date.replace(day=1, hour=0, minute=0, second=0)
+    month = datetime.now().date().replace(day=1)
     try:
-        transactions_amount = await Transaction.get_category_transactions_amount(
+        transactions_amount = await CategorySpending.get_amount(
             user_id=user_id,
             category_id=limit.category_id,
-            start_date=start_date,
-            end_date=end_date
+            month=month
         )
     except DatabaseError:
         return
 
-    if transactions_amount < limit["amount"]:
-        return
-
-    notification = LIMIT_NOTIFICATION_TEXT.format(
-        category=limit["category_name"],
-        limit=limit["amount"],
-        amount=limit["amount"] - transactions_amount
-    )
+    return format_limit_notification(limit.category_name, limit.amount, transactions_amount)
 
-    return notification
 
-
-async def send_user_notifications(user_id, transaction):
-    """Send transaction, limit notifications to user."""
-    try:
-        user = await User.get(user_id)
-    except DatabaseError:
-        return
+async def send_user_notifications(user_id, transaction, context=None):
+    """
+    Send transaction, limit notifications to user. Return False if any of them was not delivered.
+    Context returned by transaction ingest is used instead of querying user, limit and spending.
+    """
+    if context is None:
+        try:
+            with STAGE_LATENCY.time("user_lookup"):
+                user = await User.get(user_id)
+        except DatabaseError:
+            return False
+    else:
+        user = context
 
     if user.telegram_id is None or not user.notifications_enabled:
         # skip notifications processing for user with deactivated telegram
         # or disabled notifications
-        return
+        return True
 
     notification_events = []
+    notifications = []
 
-    transaction_notification = await get_transaction_notification(transaction)
-    notification_events.append(transaction_notification)
+    transaction_notification = get_transaction_notification(transaction)
+    if notification_coalescer.enabled:
+        notifications.append(notification_coalescer.add(user.telegram_id, transaction_notification))
+    else:
+        notification_events.append(transaction_notification)
 
     if transaction["amount"] < 0:
-        limit_event = await get_limit_notification(user.id, transaction["mcc"])
+        with STAGE_LATENCY.time("limit_check"):
+            if context is None:
+                limit_event = await get_limit_notification(user_id, transaction["mcc"])
+            else:
+                limit_event = format_limit_notification(
+                    context.category_name,
+                    context.limit_amount,
+                    context.spending_amount
+                )
         notification_events.append(limit_event)
 
-    async with ClientSession() as aio_session:
-        notifications = [
-            send_notification(aio_session, user.telegram_id, notification)
-            for notification in notification_events
-            if notification is not None
-        ]
+    notifications.extend(
+        telegram_client.send_message(user.telegram_id, notification)
+        for notification in notification_events
+        if notification is not None
+    )
 
-        await asyncio.gather(*notifications)
+    with STAGE_LATENCY.time("notification_delivery"):
+        return all(await asyncio.gather(*notifications))
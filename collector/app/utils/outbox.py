@@ -0,0 +1,87 @@
+"""This module provides functionality for draining notification outbox."""
+
+import time
+import asyncio
+import logging
+
+from app import config
+from app.models.outbox import NotificationOutbox
+from app.utils.errors import DatabaseError
+from app.utils.notification import send_user_notifications
+
+
+LOGGER = logging.getLogger(__name__)
+
+
+class OutboxConsumer:
+    """Class that delivers pending notifications from outbox with retries."""
+
+    def __init__(self, concurrency):
+        """Set count of notifications processed concurrently."""
+        self.concurrency = concurrency
+        self.delivered = 0
+        self.retried = 0
+        self.failed = 0
+
+    async def run(self):
+        """Claim and process pending notifications until cancelled."""
+        stats_task = asyncio.create_task(self._report_stats())
+        try:
+            while True:
+                try:
+                    notifications = await NotificationOutbox.claim(self.concurrency, config.NOTIFICATION_OUTBOX_LEASE)
+                except DatabaseError:
+                    notifications = []
+
+                if notifications:
+                    await asyncio.gather(*[self._process(notification) for notification in notifications])
+
+                if len(notifications) < self.concurrency:
+                    await asyncio.sleep(config.NOTIFICATION_OUTBOX_POLL_INTERVAL)
+        finally:
+            stats_task.cancel()
+
+    async def _process(self, notification):
+        """Deliver notification and complete or reschedule it."""
+        try:
+            delivered = await send_user_notifications(notification["user_id"], notification["transaction"])
+            error = None if delivered else "Notification was not delivered."
+        except Exception as err:  # pylint: disable=broad-except
+            delivered, error = False, str(err)
+
+        try:
+            if delivered:
+                await NotificationOutbox.complete(notification["id"])
+                self.delivered += 1
+            elif notification["attempts"] >= config.NOTIFICATION_OUTBOX_RETRY_LIMIT:
+                LOGGER.error("Notification=%s was not delivered after %s attempts. Error: %s",
+                             notification["id"], notification["attempts"], error)
+                await NotificationOutbox.fail(notification["id"], error)
+                self.failed += 1
+            else:
+                delay = min(
+                    config.NOTIFICATION_OUTBOX_RETRY_INTERVAL * 2 ** (notification["attempts"] - 1),
+                    config.NOTIFICATION_OUTBOX_RETRY_MAX_INTERVAL
+                )
+                await NotificationOutbox.retry(notification["id"], delay, error)
+                self.retried += 1
+        except DatabaseError:
+            # notification will be claimed again once its lease expires
+            pass
+
+    async def _report_stats(self):
+        """Periodically log delivery throughput and outbox lag."""
+        delivered, started_at = self.delivered, time.monotonic()
+        while True:
+            await asyncio.sleep(config.NOTIFICATION_OUTBOX_STATS_INTERVAL)
+            try:
+                stats = await NotificationOutbox.get_stats()
+            except DatabaseError:
+                continue
+
+            now = time.monotonic()
+            LOGGER.info(
+                "Notification outbox: %.2f delivered/s, %s pending, %s failed, lag %.2fs.",
+                (self.delivered - delivered) / (now - started_at), stats["pending"], stats["failed"], stats["lag"]
+            )
+            delivered, started_at = self.delivered, now
@@ -0,0 +1,69 @@
+"""This module provides buffer of recent transaction events for replaying them to reconnected clients."""
+
+import logging
+
+import aioredis
+
+from app import config
+from app.cache import redis, TRANSACTION_EVENTS_CACHE_KEY, TRANSACTION_EVENTS_SEQ_CACHE_KEY
+from app.utils import codec
+
+
+LOGGER = logging.getLogger(__name__)
+
+
+class TransactionEvents:
+    """Class that keeps bounded per-user list of recent transaction events with sequence ids in redis."""
+
+    def __init__(self, size, ttl):
+        """Set count of events kept per user and their time to live in seconds."""
+        self.size = size
+        self.ttl = ttl
+
+    async def add(self, user_id, transaction):
+        """Assign next sequence id to transaction event and remember it. Return the event."""
+        event = {"seq": None, "transaction": transaction}
+        events_key = TRANSACTION_EVENTS_CACHE_KEY.format(user_id=user_id)
+        try:
+            # sequence is not expired, so it keeps increasing after buffer of idle user has expired
+            event["seq"] = await redis.pool.incr(TRANSACTION_EVENTS_SEQ_CACHE_KEY.format(user_id=user_id))
+            multi = redis.pool.multi_exec()
+            multi.lpush(events_key, codec.dumps(event))
+            multi.ltrim(events_key, 0, self.size - 1)
+            multi.expire(events_key, self.ttl)
+            await multi.execute()
+        except (aioredis.RedisError, OSError) as err:
+            LOGGER.warning("Could not remember transaction event for user=%s. Error: %s", user_id, err)
+
+        return event
+
+    async def get_since(self, user_id, since):
+        """
+        Return events with sequence id greater than since, the latest sequence id
+        and False if some of missed events were already evicted from buffer.
+        """
+        try:
+            multi = redis.pool.multi_exec()
+            multi.lrange(TRANSACTION_EVENTS_CACHE_KEY.format(user_id=user_id), 0, -1)
+            multi.get(TRANSACTION_EVENTS_SEQ_CACHE_KEY.format(user_id=user_id))
+            events, latest = await multi.execute()
+        except (aioredis.RedisError, OSError) as err:
+            LOGGER.warning("Could not retrieve transaction events for user=%s. Error: %s", user_id, err)
+            return [], None, False
+
+        latest = int(latest or 0)
+        if since is None or since == latest:
+            return [], latest, True
+        if since > latest:
+            # cursor is ahead of sequence which was lost together with redis data
+            return [], latest, False
+
+        missed = sorted(
+            (event for event in map(codec.loads, events) if event["seq"] > since),
+            key=lambda event: event["seq"]
+        )
+        complete = bool(missed) and missed[0]["seq"] == since + 1
+        return missed, latest, complete
+
+
+transaction_events = TransactionEvents(size=config.SOCKETIO_REPLAY_SIZE, ttl=config.SOCKETIO_REPLAY_TTL)
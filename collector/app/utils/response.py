@@ -2,6 +2,8 @@
 
 from aiohttp import web
 
+from app.utils import codec
+
 
 def make_response(success, http_status, data=None, message=None):
     """Return formatted json response."""
@@ -10,4 +12,4 @@ def make_response(success, http_status, data=None, message=None):
         "message": message,
         "data": data
     }
-    return web.json_response(response, status=http_status)
+    return web.json_response(response, status=http_status, dumps=codec.dumps)
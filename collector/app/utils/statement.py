@@ -0,0 +1,76 @@
+"""This module provides streaming reading of monobank statement dumps."""
+
+import json
+
+from app.utils import codec
+
+
+READ_CHUNK_SIZE = 64 * 1024
+JSON_DECODER = json.JSONDecoder()
+
+
+def read_json_array(dump_file):
+    """Yield elements of top level json array decoding them one by one."""
+    buffer = ""
+    while not buffer:
+        chunk = dump_file.read(READ_CHUNK_SIZE)
+        if not chunk:
+            break
+        buffer = chunk.lstrip()
+
+    if not buffer.startswith("["):
+        raise ValueError("Statement dump should be a json array.")
+
+    position, eof = 1, False
+    while True:
+        # skip separators between array elements
+        while position < len(buffer) and buffer[position] in " \t\r\n,":
+            position += 1
+
+        if position < len(buffer) and buffer[position] == "]":
+            return
+
+        try:
+            item, end = JSON_DECODER.raw_decode(buffer, position)
+        except ValueError:
+            if eof:
+                raise
+            item, end = None, None
+
+        # element could be cut by chunk boundary, so it is decoded again with more data
+        if item is None or end == len(buffer) and not eof:
+            chunk = dump_file.read(READ_CHUNK_SIZE)
+            eof = not chunk
+            buffer, position = buffer[position:] + chunk, 0
+            continue
+
+        yield item
+        position = end
+        if position > READ_CHUNK_SIZE:
+            buffer, position = buffer[position:], 0
+
+
+def read_ndjson(dump_file):
+    """Yield json objects from file with one object per line."""
+    for line in dump_file:
+        line = line.strip()
+        if line:
+            yield codec.loads(line)
+
+
+def read_statement_items(dump_file):
+    """
+    Yield monobank webhook payloads from json array or ndjson dump.
+    Bare statement items (as returned by statement API) are wrapped into webhook payload.
+    """
+    first_char = dump_file.read(1)
+    while first_char.isspace():
+        first_char = dump_file.read(1)
+    dump_file.seek(0)
+
+    items = read_json_array(dump_file) if first_char == "[" else read_ndjson(dump_file)
+    for item in items:
+        if "data" not in item:
+            item = {"data": {"statementItem": item}}
+
+        yield item
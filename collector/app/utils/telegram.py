@@ -1,25 +1,181 @@
-"""This module provides functionality for pushing notification event to SQS."""
+"""This module provides functionality for sending telegram notifications."""
 
+import time
+import asyncio
 import logging
+from contextlib import suppress
 
-from app.config import TELEGRAM_API
+from aiohttp import ClientError, ClientSession, ClientTimeout, TCPConnector
+
+from app import config
+from app.metrics import STAGE_LATENCY, TELEGRAM_SENDS
 
 
 LOGGER = logging.getLogger(__name__)
 
-TELEGRAM_API_SEND_MESSAGE = f"{TELEGRAM_API}/sendMessage"
+TELEGRAM_API_SEND_MESSAGE = f"{config.TELEGRAM_API}/sendMessage"
+TOO_MANY_REQUESTS = 429
+
+
+class TelegramClient:
+    """
+    Class that sends telegram messages through one pooled session.
+
+    Messages are put to bounded queue and sent by fixed number of workers.
+    Per-chat rate limit is awaited by the sender before message is queued, so
+    messages to the same chat keep their order and a busy chat holds neither
+    workers nor global send slots. Workers space requests by global rate limit.
+    """
+
+    def __init__(self):
+        """Prepare client state. Session and workers are created on start."""
+        self.session = None
+        self._queue = None
+        self._workers = []
+        self._global_slot = 0
+        self._chat_slots = {}
+        self._paused_until = 0
+        self._deferred = 0
+
+    async def start(self):
+        """Open pooled http session and start sending workers."""
+        self.session = ClientSession(
+            connector=TCPConnector(limit=config.TELEGRAM_CONCURRENCY, ttl_dns_cache=300),
+            timeout=ClientTimeout(total=config.TELEGRAM_TIMEOUT)
+        )
+        self._queue = asyncio.Queue(maxsize=config.TELEGRAM_QUEUE_SIZE)
+        self._workers = [asyncio.create_task(self._work()) for _ in range(config.TELEGRAM_CONCURRENCY)]
+
+    async def close(self):
+        """Wait until deferred and queued messages are sent, then stop workers and close session."""
+        if self.session is None:
+            return
+
+        with suppress(asyncio.TimeoutError):
+            await asyncio.wait_for(self._drain(), timeout=config.TELEGRAM_CLOSE_TIMEOUT)
+
+        session, self.session = self.session, None
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+        while not self._queue.empty():
+            params, future = self._queue.get_nowait()
+            self._queue.task_done()
+            LOGGER.error("A telegram notification was not sent to chat=%s: client is closed.", params["chat_id"])
+            if not future.done():
+                future.set_result(False)
+
+        await session.close()
+
+    async def _drain(self):
+        """Wait until messages delayed by chat rate limit are queued and queue is processed."""
+        while self._deferred:
+            await asyncio.sleep(0.05)
+        await self._queue.join()
+
+    @property
+    def queue_size(self):
+        """Return count of messages waiting to be sent."""
+        return self._deferred + (self._queue.qsize() if self._queue is not None else 0)
 
+    async def send_message(self, chat_id, text, parse_mode="markdown", disable_notification=True):
+        """Queue message to chat and wait until it is sent. Return True if it was delivered."""
+        if self.session is None:
+            LOGGER.error("A telegram notification was not sent to chat=%s: client is closed.", chat_id)
+            return False
 
-async def send_notification(aio_session, telegram_id, text, parse_mode="markdown", disable_notification=True):
-    """Send notification message to appropriated user."""
-    notification_params = {
-        "chat_id": telegram_id,
-        "text": text,
-        "parse_mode": parse_mode,
-        "disable_notification": str(disable_notification).lower()
-    }
+        params = {
+            "chat_id": chat_id,
+            "text": text,
+            "parse_mode": parse_mode,
+            "disable_notification": str(disable_notification).lower()
+        }
+        delay = self._reserve_chat_slot(chat_id)
+        if delay > 0:
+            self._deferred += 1
+            try:
+                await asyncio.sleep(delay)
+            finally:
+                self._deferred -= 1
 
-    async with aio_session.get(TELEGRAM_API_SEND_MESSAGE, params=notification_params) as response:
-        response_json = await response.json()
-        if not response_json["ok"]:
+            if self.session is None:
+                LOGGER.error("A telegram notification was not sent to chat=%s: client is closed.", chat_id)
+                return False
+
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((params, future))
+        return await future
+
+    def _reserve_chat_slot(self, chat_id):
+        """Reserve the nearest time when message may be sent to chat. Return delay until it."""
+        now = time.monotonic()
+        if len(self._chat_slots) > config.TELEGRAM_QUEUE_SIZE:
+            self._chat_slots = {chat: slot for chat, slot in self._chat_slots.items() if slot > now}
+
+        slot = max(now, self._chat_slots.get(chat_id, 0))
+        self._chat_slots[chat_id] = slot + 1 / config.TELEGRAM_CHAT_RATE
+        return slot - now
+
+    def _reserve_slot(self):
+        """Reserve the nearest global send slot respecting throttling pause. Return delay until it."""
+        now = time.monotonic()
+        slot = max(now, self._paused_until, self._global_slot)
+        self._global_slot = slot + 1 / config.TELEGRAM_GLOBAL_RATE
+        return slot - now
+
+    async def _work(self):
+        """Send queued messages one by one."""
+        while True:
+            params, future = await self._queue.get()
+            try:
+                delivered = await self._send(params)
+            except Exception as err:  # pylint: disable=broad-except
+                LOGGER.error("A telegram notification was not sent to chat=%s. Error: %s", params["chat_id"], err)
+                delivered = False
+            finally:
+                self._queue.task_done()
+
+            if not future.done():
+                future.set_result(delivered)
+
+    async def _send(self, params):
+        """Send message respecting rate limits and retrying throttled or failed attempts."""
+        for attempt in range(1, config.TELEGRAM_RETRY_LIMIT + 1):
+            if attempt > 1:
+                # retried message is not spaced by sender anymore
+                await asyncio.sleep(self._reserve_chat_slot(params["chat_id"]))
+            await asyncio.sleep(self._reserve_slot())
+            try:
+                with STAGE_LATENCY.time("telegram"):
+                    async with self.session.get(TELEGRAM_API_SEND_MESSAGE, params=params) as response:
+                        response_json = await response.json()
+            except (ClientError, asyncio.TimeoutError) as err:
+                TELEGRAM_SENDS.inc("error")
+                LOGGER.warning("Telegram request failed (attempt=%s). Error: %s", attempt, err)
+                await asyncio.sleep(attempt * config.TELEGRAM_RETRY_INTERVAL)
+                continue
+
+            if response_json["ok"]:
+                TELEGRAM_SENDS.inc("delivered")
+                return True
+
+            if response_json.get("error_code") == TOO_MANY_REQUESTS:
+                retry_after = response_json.get("parameters", {}).get("retry_after", config.TELEGRAM_RETRY_INTERVAL)
+                self._paused_until = max(self._paused_until, time.monotonic() + retry_after)
+                TELEGRAM_SENDS.inc("throttled")
+                LOGGER.warning("Telegram requests are throttled for %s seconds (attempt=%s).", retry_after, attempt)
+                continue
+
+            TELEGRAM_SENDS.inc("rejected")
             LOGGER.error("A telegram notification was not delivered. Response: %s", response_json)
+            return False
+
+        TELEGRAM_SENDS.inc("failed")
+        LOGGER.error("A telegram notification was not delivered to chat=%s after %s attempts.",
+                     params["chat_id"], config.TELEGRAM_RETRY_LIMIT)
+        return False
+
+
+telegram_client = TelegramClient()
@@ -0,0 +1,61 @@
+"""This module provides warm-up of worker connections and caches before it receives traffic."""
+
+import time
+import asyncio
+import logging
+from contextlib import AsyncExitStack
+
+from app import config
+from app.db import db
+from app.cache import redis
+from app.models.user import User
+
+
+LOGGER = logging.getLogger(__name__)
+
+WARMUP_QUERY = db.text("SELECT 1")
+
+
+async def warm_up_database(count):
+    """Open count of database pool connections at once and run query on each of them."""
+    count = min(count, config.POSTGRES_POOL_MAX_SIZE)
+    async with AsyncExitStack() as stack:
+        # connections are held together so pool has to open count of distinct ones
+        connections = [await stack.enter_async_context(db.acquire()) for _ in range(count)]
+        for connection in connections:
+            await connection.scalar(WARMUP_QUERY)
+
+
+async def warm_up_redis(count):
+    """Open count of redis pool connections by concurrent pings."""
+    count = min(count, config.REDIS_POOL_MAX_SIZE)
+    await asyncio.gather(*(redis.pool.ping() for _ in range(count)))
+
+
+async def warm_up_users(limit):
+    """Load recently active users profiles and limits into cache. Return count of primed users."""
+    user_ids = await User.get_active_ids(limit)
+    if not user_ids:
+        return 0
+
+    return await User.prime(user_ids)
+
+
+async def warm_up(app):
+    """Run warm-up steps and mark worker ready even if some of them failed."""
+    started_at = time.perf_counter()
+    steps = (
+        ("postgres", warm_up_database, app.config.WARMUP_POSTGRES_CONNECTIONS),
+        ("redis", warm_up_redis, app.config.WARMUP_REDIS_CONNECTIONS),
+        ("users", warm_up_users, app.config.WARMUP_USERS)
+    )
+    try:
+        for name, step, size in steps:
+            try:
+                await step(size)
+            except Exception as err:  # pylint: disable=broad-except
+                LOGGER.error("Warm-up step=%s failed. Error: %s", name, err)
+    finally:
+        app["ready"] = True
+
+    LOGGER.info("Worker warm-up finished in %.3fs.", time.perf_counter() - started_at)
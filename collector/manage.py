@@ -0,0 +1,210 @@
+"""This module provides entrypoint for collector maintenance commands."""
+
+import re
+import json
+import time
+import asyncio
+import argparse
+from datetime import datetime
+from itertools import islice
+
+from app import config
+from app.db import db, get_database_dsn
+from app.cache import redis, MCC_UPDATES_CHANNEL, USER_UPDATES_CHANNEL
+from app.main import init_logging
+from app.pubsub import pubsub
+from app.models.mcc import MCC
+from app.models.outbox import NotificationOutbox
+from app.models.partition import TransactionPartition, add_months
+from app.models.spending import CategorySpending
+from app.models.transaction import Transaction
+from app.models.user import User
+from app.utils.monobank import parse_transaction_response
+from app.utils.statement import read_statement_items
+from app.utils.notification import notification_coalescer
+from app.utils.outbox import OutboxConsumer
+from app.utils.telegram import telegram_client
+
+
+async def rebuild_spending(args):  # pylint: disable=unused-argument
+    """Recompute monthly category spending totals from raw transactions."""
+    await CategorySpending.create_table()
+    await CategorySpending.rebuild()
+
+
+async def outbox_worker(args):
+    """Deliver pending notifications from outbox until interrupted."""
+    await NotificationOutbox.create_table()
+
+    pubsub.subscribe(MCC_UPDATES_CHANNEL, MCC.refresh)
+    pubsub.subscribe(USER_UPDATES_CHANNEL, User.invalidate)
+    await redis.connect()
+    await pubsub.start()
+    await MCC.load(await MCC.get_version())
+    await telegram_client.start()
+    try:
+        await OutboxConsumer(args.concurrency).run()
+    finally:
+        await notification_coalescer.close()
+        await telegram_client.close()
+        await pubsub.stop()
+        await redis.close()
+
+
+async def outbox_stats(args):  # pylint: disable=unused-argument
+    """Print count of pending and failed notifications and outbox lag."""
+    print(json.dumps(await NotificationOutbox.get_stats()))
+
+
+def make_import_row(user_id, payload):
+    """Return transaction row of statement item with mcc code checked against MCC table."""
+    transaction = parse_transaction_response(payload)
+    mcc = transaction["mcc"] if MCC.exists(transaction["mcc"]) else -1
+    return {
+        "user_id": user_id,
+        "mcc": mcc,
+        "timestamp": datetime.fromtimestamp(transaction["timestamp"]),
+        "transaction": transaction
+    }
+
+
+async def import_statements(args):
+    """Bulk load monobank statement dump of user without sending notifications."""
+    await CategorySpending.create_table()
+    await MCC.load()
+
+    read = inserted = 0
+    started_at = time.perf_counter()
+    with open(args.path) as dump_file:
+        rows = (make_import_row(args.user, payload) for payload in read_statement_items(dump_file))
+        while True:
+            chunk = list(islice(rows, args.chunk_size))
+            if not chunk:
+                break
+
+            inserted += await Transaction.import_transactions(chunk)
+            read += len(chunk)
+            elapsed = time.perf_counter() - started_at
+            print(
+                f"read={read} inserted={inserted} skipped={read - inserted} "
+                f"elapsed={elapsed:.1f}s rate={read / elapsed:.0f}/s",
+                flush=True
+            )
+
+    print(json.dumps({"read": read, "inserted": inserted, "skipped": read - inserted}))
+
+
+async def partitions_migrate(args):
+    """Convert transaction table to monthly partitioned one."""
+    migrated = await TransactionPartition.migrate(args.months_ahead)
+    print(json.dumps({"migrated": migrated}))
+
+
+async def partitions_ensure(args):
+    """Create missing upcoming transaction partitions."""
+    print(json.dumps({"created": await TransactionPartition.ensure(args.months_ahead)}))
+
+
+async def partitions_detach(args):
+    """Detach transaction partitions older than kept months."""
+    before = add_months(datetime.now().date().replace(day=1), -args.keep_months)
+    detached = await TransactionPartition.detach(before, args.archive_schema)
+    print(json.dumps({"before": before.isoformat(), "detached": detached}))
+
+
+def schema_name(value):
+    """Check that archive schema is plain identifier."""
+    if not re.fullmatch(r"[a-z_][a-z0-9_]*", value):
+        raise argparse.ArgumentTypeError(f"Invalid schema name: {value}")
+
+    return value
+
+
+def parse_args():
+    """Parse command line arguments of maintenance commands."""
+    parser = argparse.ArgumentParser(description="Collector maintenance commands.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    rebuild_spending_parser = commands.add_parser(
+        "rebuild-spending",
+        help="Recompute monthly category spending totals from transaction table."
+    )
+    rebuild_spending_parser.set_defaults(handler=rebuild_spending)
+
+    outbox_worker_parser = commands.add_parser(
+        "outbox-worker",
+        help="Deliver pending notifications from notification outbox."
+    )
+    outbox_worker_parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=config.NOTIFICATION_OUTBOX_CONCURRENCY,
+        help="Count of notifications processed concurrently."
+    )
+    outbox_worker_parser.set_defaults(handler=outbox_worker)
+
+    outbox_stats_parser = commands.add_parser(
+        "outbox-stats",
+        help="Print notification outbox stats as json."
+    )
+    outbox_stats_parser.set_defaults(handler=outbox_stats)
+
+    import_parser = commands.add_parser(
+        "import",
+        help="Bulk load monobank statement items from json or ndjson dump."
+    )
+    import_parser.add_argument("path", help="Path to json array or ndjson file with statement items.")
+    import_parser.add_argument("--user", type=int, required=True, help="Id of user that owns statement.")
+    import_parser.add_argument(
+        "--chunk-size",
+        type=int,
+        default=5000,
+        help="Count of transactions copied to database at once."
+    )
+    import_parser.set_defaults(handler=import_statements)
+
+    for command, handler, help_text in (
+            ("partitions-migrate", partitions_migrate, "Convert transaction table to monthly partitioned table."),
+            ("partitions-ensure", partitions_ensure, "Create missing upcoming monthly transaction partitions.")
+    ):
+        partitions_parser = commands.add_parser(command, help=help_text)
+        partitions_parser.add_argument(
+            "--months-ahead",
+            type=int,
+            default=config.TRANSACTION_PARTITIONS_AHEAD,
+            help="Count of months after current one to create partitions for."
+        )
+        partitions_parser.set_defaults(handler=handler)
+
+    partitions_detach_parser = commands.add_parser(
+        "partitions-detach",
+        help="Detach monthly transaction partitions older than kept months."
+    )
+    partitions_detach_parser.add_argument(
+        "--keep-months",
+        type=int,
+        required=True,
+        help="Count of months before current one which partitions are kept attached."
+    )
+    partitions_detach_parser.add_argument(
+        "--archive-schema",
+        type=schema_name,
+        help="Move detached partitions to this schema."
+    )
+    partitions_detach_parser.set_defaults(handler=partitions_detach)
+
+    return parser.parse_args()
+
+
+async def main(args):
+    """Run maintenance command with bound database connection."""
+    await db.set_bind(get_database_dsn())
+    try:
+        await args.handler(args)
+    finally:
+        await db.pop_bind().close()
+
+
+if __name__ == '__main__':
+    init_logging()
+    asyncio.run(main(parse_args()))
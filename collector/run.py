@@ -1,22 +1,206 @@
-"""This module provides entrypoint for running collector application."""
+"""
+This module provides entrypoint for running collector application.
 
+Set COLLECTOR_WORKERS to count of worker processes ("auto" for count of CPUs available
+to the process and its cgroup quota) to run prefork launcher: reference data is loaded once before fork, workers
+listen on the same port with SO_REUSEPORT and crashed workers are restarted.
+"""
+
+import gc
 import os
+import math
+import time
+import signal
+import asyncio
+import logging
 
+import aioredis
 from aiohttp.web import run_app
 
-from app.main import init_app
+from app.db import db, get_database_dsn
+from app.cache import redis
+from app.main import init_app, init_logging
+from app.models.mcc import MCC
+from app.utils.errors import DatabaseError
+from app.utils.log import queue_logging
 
 
 ACCESS_LOG_FORMAT = "%a [VIEW: %r] [RESPONSE: %s (%bb)] [TIME: %Dms]"
+RESTART_INTERVAL = 1  # seconds between restarts of worker that crashed right after start
+CGROUP_CPU_MAX = "/sys/fs/cgroup/cpu.max"
+CGROUP_CPU_QUOTA = "/sys/fs/cgroup/cpu/cpu.cfs_quota_us"
+CGROUP_CPU_PERIOD = "/sys/fs/cgroup/cpu/cpu.cfs_period_us"
 
+LOGGER = logging.getLogger(__name__)
+
+
+def read_cpu_quota():
+    """Return CPU limit of container cgroup (v2 or v1) or None if CPU time is not limited."""
+    try:
+        with open(CGROUP_CPU_MAX) as cpu_max:
+            quota, period = cpu_max.read().split()
+    except (OSError, ValueError):
+        try:
+            with open(CGROUP_CPU_QUOTA) as cpu_quota, open(CGROUP_CPU_PERIOD) as cpu_period:
+                quota, period = cpu_quota.read().strip(), cpu_period.read().strip()
+        except OSError:
+            return None
+
+    if quota in ("max", "-1"):
+        return None
+    return int(quota) / int(period)
+
+
+def get_workers_count(workers):
+    """
+    Return count of worker processes. "auto" means count of CPUs available to the process
+    limited by container CPU quota, since affinity reports all host CPUs inside container.
+    """
+    if workers != "auto":
+        return max(int(workers), 1)
+
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cpus = os.cpu_count() or 1
+
+    quota = read_cpu_quota()
+    if quota is not None:
+        cpus = min(cpus, math.floor(quota))
+    return max(cpus, 1)
 
-if __name__ == '__main__':
-    host = os.environ.get("COLLECTOR_HOST", "localhost")
-    port = os.environ.get("COLLECTOR_PORT", "5010")
 
+def install_uvloop():
+    """Use uvloop event loop if it is installed."""
+    try:
+        import uvloop  # pylint: disable=import-outside-toplevel
+    except ImportError:
+        LOGGER.warning("uvloop is not installed, default asyncio event loop is used.")
+        return
+
+    uvloop.install()
+    LOGGER.info("uvloop event loop is used.")
+
+
+async def preload():
+    """Load read-only reference data in master process, so workers share it after fork."""
+    try:
+        await redis.connect()
+        version = await MCC.get_version()
+    except (aioredis.RedisError, OSError) as err:
+        LOGGER.error("Could not get MCC reference table version. Error: %s", err)
+        version = None
+    finally:
+        await redis.close()
+
+    await db.set_bind(get_database_dsn())
+    try:
+        await MCC.load(version)
+    except DatabaseError:
+        LOGGER.error("MCC reference table was not preloaded. Workers will load it on startup.")
+    finally:
+        await db.pop_bind().close()
+
+
+def serve(host, port, reuse_port=None):
+    """Run collector application in current process until it is stopped."""
     run_app(
         init_app(),
         host=host,
-        port=int(port),
-        access_log_format=ACCESS_LOG_FORMAT
+        port=port,
+        access_log_format=ACCESS_LOG_FORMAT,
+        reuse_port=reuse_port
     )
+
+
+def run_worker(host, port):
+    """Serve application on shared port in forked worker process and exit it."""
+    # worker is stopped by aiohttp graceful shutdown instead of master handlers
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    # loop of preload was closed by asyncio.run in master, worker runs its own one
+    asyncio.set_event_loop(asyncio.new_event_loop())
+    exit_code = 0
+    try:
+        serve(host, port, reuse_port=True)
+    except Exception:  # pylint: disable=broad-except
+        LOGGER.exception("Worker pid=%s crashed.", os.getpid())
+        exit_code = 1
+    finally:
+        queue_logging.stop()
+
+    os._exit(exit_code)  # pylint: disable=protected-access
+
+
+def spawn_worker(host, port):
+    """Fork worker process serving application on shared port and return its pid."""
+    pid = os.fork()
+    if pid == 0:
+        run_worker(host, port)
+
+    return pid
+
+
+def run_workers(count, host, port):
+    """Run count of worker processes and restart crashed ones until master is stopped."""
+    try:
+        asyncio.run(preload())
+    except Exception:  # pylint: disable=broad-except
+        LOGGER.exception("Reference data was not preloaded. Workers will load it on startup.")
+    # objects created before fork are never collected, so their memory pages stay shared with workers
+    gc.freeze()
+
+    workers = {}
+    stopping = False
+
+    def stop(signum, frame):  # pylint: disable=unused-argument
+        """Stop all workers gracefully."""
+        nonlocal stopping
+        stopping = True
+        for pid in list(workers):
+            os.kill(pid, signal.SIGTERM)
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    for _ in range(count):
+        workers[spawn_worker(host, port)] = time.monotonic()
+    LOGGER.info("Collector master pid=%s started %s workers on %s:%s.", os.getpid(), count, host, port)
+
+    while workers:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+
+        started_at = workers.pop(pid, None)
+        if started_at is None or stopping:
+            continue
+
+        LOGGER.error("Worker pid=%s exited with code=%s. Restarting it.", pid, os.waitstatus_to_exitcode(status))
+        if time.monotonic() - started_at < RESTART_INTERVAL:
+            time.sleep(RESTART_INTERVAL)
+        workers[spawn_worker(host, port)] = time.monotonic()
+
+    LOGGER.info("Collector master pid=%s stopped.", os.getpid())
+
+
+def main():
+    """Run collector in single process or prefork mode configured by environment."""
+    host = os.environ.get("COLLECTOR_HOST", "localhost")
+    port = os.environ.get("COLLECTOR_PORT", "5010")
+    workers = os.environ.get("COLLECTOR_WORKERS", "1")
+    use_uvloop = os.environ.get("COLLECTOR_UVLOOP", "false").lower() == "true"
+
+    init_logging()
+    if use_uvloop:
+        install_uvloop()
+
+    if workers == "1":
+        serve(host, int(port))
+    else:
+        run_workers(get_workers_count(workers), host, int(port))
+
+
+if __name__ == '__main__':
+    main()
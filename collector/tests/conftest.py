@@ -0,0 +1,83 @@
+"""Common setup of collector unit tests."""
+# pylint: disable=missing-function-docstring
+
+import os
+import sys
+import asyncio
+
+import pytest
+
+# app config requires secrets on import, unit tests do not use real ones
+os.environ.setdefault("MONOBANK_WEBHOOK_SECRET", "test-webhook-secret")
+os.environ.setdefault("JWT_SECRET_KEY", "test-jwt-secret")
+os.environ.setdefault("TELEGRAM_BOT_TOKEN", "test-bot-token")
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir)))
+
+
+class FakePipeline:
+    """Pipeline that runs recorded commands of fake redis on execute."""
+
+    def __init__(self, pool):
+        self._pool = pool
+        self._commands = []
+
+    def __getattr__(self, name):
+        def record(*args, **kwargs):
+            self._commands.append((getattr(self._pool, name), args, kwargs))
+        return record
+
+    async def execute(self):
+        return [await command(*args, **kwargs) for command, args, kwargs in self._commands]
+
+
+class FakeRedisPool:
+    """In-memory replacement of aioredis pool with commands used by collector."""
+
+    def __init__(self):
+        self.data = {}
+        self.calls = []
+        self.error = None
+
+    async def _call(self, name):
+        self.calls.append(name)
+        await asyncio.sleep(0)
+        if self.error is not None:
+            raise self.error
+
+    async def get(self, key, encoding="utf-8"):  # pylint: disable=unused-argument
+        await self._call("get")
+        return self.data.get(key)
+
+    async def mget(self, *keys, encoding="utf-8"):  # pylint: disable=unused-argument
+        await self._call("mget")
+        return [self.data.get(key) for key in keys]
+
+    async def set(self, key, value, expire=0):  # pylint: disable=unused-argument
+        await self._call("set")
+        self.data[key] = value
+
+    async def delete(self, *keys):
+        await self._call("delete")
+        for key in keys:
+            self.data.pop(key, None)
+
+    async def lrange(self, key, start, stop):
+        await self._call("lrange")
+        values = self.data.get(key, [])
+        return values[start:] if stop == -1 else values[start:stop + 1]
+
+    def pipeline(self):
+        return FakePipeline(self)
+
+    multi_exec = pipeline
+
+
+@pytest.fixture
+def fake_redis(monkeypatch):
+    """Replace shared redis pool with in-memory one."""
+    from app.cache import redis  # pylint: disable=import-outside-toplevel
+
+    pool = FakeRedisPool()
+    monkeypatch.setattr(redis, "pool", pool)
+    return pool
@@ -0,0 +1,129 @@
+"""Tests of batch writer."""
+# pylint: disable=missing-function-docstring
+
+import asyncio
+
+import pytest
+from asyncpg import exceptions
+
+from app.models.transaction import Transaction
+from app.utils.batch import BatchWriter
+from app.utils.errors import DatabaseError, DuplicateError
+
+
+def test_batch_is_written_when_full():
+    batches = []
+
+    async def write(items):
+        batches.append(items)
+        return [item * 2 for item in items]
+
+    async def run():
+        writer = BatchWriter(write, batch_size=3, max_latency=60)
+        return await asyncio.gather(*(writer.submit(item) for item in range(3)))
+
+    assert asyncio.run(run()) == [0, 2, 4]
+    assert batches == [[0, 1, 2]]
+
+
+def test_batch_is_written_after_max_latency():
+    batches = []
+
+    async def write(items):
+        batches.append(items)
+        return [None] * len(items)
+
+    async def run():
+        writer = BatchWriter(write, batch_size=100, max_latency=0.01)
+        await asyncio.gather(writer.submit("a"), writer.submit("b"))
+        await writer.submit("c")
+
+    asyncio.run(run())
+    assert batches == [["a", "b"], ["c"]]
+
+
+def test_exception_result_is_raised_for_its_submitter_only():
+    async def write(items):
+        return [ValueError(item) if item == "bad" else item for item in items]
+
+    async def run():
+        writer = BatchWriter(write, batch_size=3, max_latency=60)
+        return await asyncio.gather(*(writer.submit(item) for item in ("a", "bad", "b")), return_exceptions=True)
+
+    good, bad, other = asyncio.run(run())
+    assert (good, other) == ("a", "b")
+    assert isinstance(bad, ValueError)
+
+
+def test_close_writes_pending_batch():
+    batches = []
+
+    async def write(items):
+        batches.append(items)
+        return [None] * len(items)
+
+    async def run():
+        writer = BatchWriter(write, batch_size=100, max_latency=60)
+        submitted = asyncio.ensure_future(writer.submit("a"))
+        await asyncio.sleep(0)
+        await writer.close()
+        return await submitted
+
+    assert asyncio.run(run()) is None
+    assert batches == [["a"]]
+
+
+def test_failed_write_is_raised_for_every_submitter():
+    async def write(items):
+        raise RuntimeError("connection lost")
+
+    async def run():
+        writer = BatchWriter(write, batch_size=2, max_latency=60)
+        return await asyncio.gather(writer.submit("a"), writer.submit("b"), return_exceptions=True)
+
+    with pytest.raises(RuntimeError):
+        raise asyncio.run(run())[1]
+
+
+def test_items_without_result_are_failed():
+    async def write(items):
+        return items[:1]
+
+    async def run():
+        writer = BatchWriter(write, batch_size=2, max_latency=60)
+        return await asyncio.gather(writer.submit("a"), writer.submit("b"), return_exceptions=True)
+
+    written, missing = asyncio.run(run())
+    assert written == "a"
+    assert isinstance(missing, RuntimeError)
+
+
+def make_row(transaction_id):
+    return {"user_id": 1, "mcc": 5411, "timestamp": None, "transaction": {"id": transaction_id}}
+
+
+def test_failed_row_of_batch_is_raised_for_its_submitter_only(monkeypatch):
+    written = []
+
+    async def write_rows(rows):
+        transaction_ids = [row["transaction"]["id"] for row in rows]
+        if len(rows) > 1 or "bad" in transaction_ids:
+            raise exceptions.ForeignKeyViolationError("violates foreign key constraint")
+
+        written.append(transaction_ids[0])
+        return {transaction_ids[0]: f"context of {transaction_ids[0]}"}
+
+    monkeypatch.setattr(Transaction, "_write_rows", write_rows)
+
+    async def run():
+        writer = BatchWriter(Transaction.create_transactions, batch_size=4, max_latency=60)
+        return await asyncio.gather(
+            *(writer.submit(make_row(transaction_id)) for transaction_id in ("a", "bad", "b", "a")),
+            return_exceptions=True
+        )
+
+    first, bad, second, duplicate = asyncio.run(run())
+    assert (first, second) == ("context of a", "context of b")
+    assert written == ["a", "b"]
+    assert isinstance(bad, DatabaseError) and not isinstance(bad, DuplicateError)
+    assert isinstance(duplicate, DuplicateError)
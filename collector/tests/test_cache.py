@@ -0,0 +1,144 @@
+"""Tests of two-tier cache."""
+# pylint: disable=missing-function-docstring,unused-argument
+
+import asyncio
+import pickle
+
+import aioredis
+
+from app import cache
+from app.cache import TieredCache
+
+
+class Loader:
+    """Loader that counts calls and returns next value."""
+
+    def __init__(self, delay=0):
+        self.calls = 0
+        self.delay = delay
+
+    async def __call__(self):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        return f"value-{self.calls}"
+
+
+def test_miss_is_loaded_once_and_stored_in_both_tiers(fake_redis):
+    tiered_cache = TieredCache("test", maxsize=10, ttl=60)
+    loader = Loader()
+
+    async def run():
+        first = await tiered_cache.get("key", loader)
+        second = await tiered_cache.get("key", loader)
+        return first, second
+
+    assert asyncio.run(run()) == ("value-1", "value-1")
+    assert loader.calls == 1
+    value, _ = pickle.loads(fake_redis.data["test--key"])
+    assert value == "value-1"
+    assert tiered_cache.stats["misses"] == 1
+    assert tiered_cache.stats["l1_hits"] == 1
+
+
+def test_concurrent_misses_are_coalesced(fake_redis):
+    tiered_cache = TieredCache("test", maxsize=10, ttl=60)
+    loader = Loader(delay=0.01)
+
+    async def run():
+        return await asyncio.gather(*(tiered_cache.get("key", loader) for _ in range(5)))
+
+    assert asyncio.run(run()) == ["value-1"] * 5
+    assert loader.calls == 1
+    assert tiered_cache.stats["coalesced"] == 4
+
+
+def test_value_is_read_from_redis_when_local_tier_misses(fake_redis, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(cache.time, "time", lambda: now[0])
+    fake_redis.data["test--key"] = pickle.dumps(("shared", now[0] + 30))
+    tiered_cache = TieredCache("test", maxsize=10, ttl=60)
+    loader = Loader()
+
+    assert asyncio.run(tiered_cache.get("key", loader)) == "shared"
+    assert loader.calls == 0
+    assert tiered_cache.stats["l2_hits"] == 1
+
+
+def test_stale_value_is_served_while_reloaded(fake_redis, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(cache.time, "time", lambda: now[0])
+    tiered_cache = TieredCache("test", maxsize=10, ttl=60, stale_ttl=30)
+    loader = Loader()
+
+    async def run():
+        await tiered_cache.get("key", loader)
+        now[0] += 70
+        stale = await tiered_cache.get("key", loader)
+        await asyncio.sleep(0.01)
+        fresh = await tiered_cache.get("key", loader)
+        return stale, fresh
+
+    assert asyncio.run(run()) == ("value-1", "value-2")
+    assert tiered_cache.stats["stale_hits"] == 1
+
+
+def test_failed_load_is_raised_and_not_cached(fake_redis):
+    tiered_cache = TieredCache("test", maxsize=10, ttl=60)
+
+    async def failing_loader():
+        raise ValueError("database is down")
+
+    async def run():
+        try:
+            await tiered_cache.get("key", failing_loader)
+        except ValueError:
+            pass
+        return await tiered_cache.get("key", Loader())
+
+    assert asyncio.run(run()) == "value-1"
+
+
+def test_redis_errors_fall_back_to_loader(fake_redis):
+    fake_redis.error = aioredis.RedisError("connection lost")
+    tiered_cache = TieredCache("test", maxsize=10, ttl=60)
+
+    assert asyncio.run(tiered_cache.get("key", Loader())) == "value-1"
+    assert tiered_cache.stats["errors"] == 2
+
+
+def test_get_many_queries_redis_once_for_local_misses(fake_redis):
+    tiered_cache = TieredCache("test", maxsize=10, ttl=60)
+
+    async def run():
+        await tiered_cache.set("a", 1)
+        fake_redis.data["test--b"] = pickle.dumps((2, float("inf")))
+        fake_redis.calls.clear()
+        return await tiered_cache.get_many(["a", "b", "c"])
+
+    assert asyncio.run(run()) == {"a": 1, "b": 2}
+    assert fake_redis.calls == ["mget"]
+
+
+def test_ttl_may_depend_on_value(fake_redis, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(cache.time, "time", lambda: now[0])
+    tiered_cache = TieredCache("test", maxsize=10, ttl=60)
+
+    async def run():
+        await tiered_cache.set_many({"empty": {}, "full": {1: 1}}, ttl=lambda value: 60 if value else 5)
+        return {key: pickle.loads(fake_redis.data[f"test--{key}"])[1] - now[0] for key in ("empty", "full")}
+
+    assert asyncio.run(run()) == {"empty": 5, "full": 60}
+
+
+def test_delete_removes_value_from_both_tiers(fake_redis):
+    tiered_cache = TieredCache("test", maxsize=10, ttl=60)
+    loader = Loader()
+
+    async def run():
+        await tiered_cache.get("key", loader)
+        await tiered_cache.delete("key")
+        return await tiered_cache.get("key", loader)
+
+    assert asyncio.run(run()) == "value-2"
+    assert "test--key" in fake_redis.data
@@ -0,0 +1,46 @@
+"""Tests of hot sql statements."""
+# pylint: disable=missing-function-docstring,protected-access,no-member
+
+from app.db import Statement, make_row_type
+
+
+def test_named_params_are_converted_to_positional():
+    statement = Statement("test_positional", """
+        SELECT amount FROM category_spending
+        WHERE user_id = :user_id and category_id = :category_id and month = :month and user_id > :user_id - 1
+    """)
+
+    assert statement.params == ["user_id", "category_id", "month"]
+    assert "user_id = $1 and category_id = $2 and month = $3 and user_id > $1 - 1" in statement.query
+
+
+def test_casts_and_literals_are_not_params():
+    statement = Statement("test_casts", """
+        SELECT CAST(:ids AS text[]), :timestamp::date, date_trunc('month', now()) + interval '1 month'
+        WHERE timestamp > '2020-01-01 10:00:00'
+    """)
+
+    assert statement.params == ["ids", "timestamp"]
+    assert "CAST($1 AS text[]), $2::date" in statement.query
+    assert "'2020-01-01 10:00:00'" in statement.query
+
+
+def test_rows_support_attribute_key_and_index_access():
+    row = make_row_type("row", ["id", "amount"])(1, 100)
+
+    assert (row.id, row["amount"], row[0]) == (1, 100, 1)
+    assert tuple(row) == (1, 100)
+
+
+def test_records_are_converted_to_rows():
+    class Record(tuple):
+        """Record with column names like asyncpg one."""
+
+        def keys(self):
+            return ["id", "amount"]
+
+    statement = Statement("test_rows", "SELECT id, amount FROM transaction")
+    rows = statement._make_rows([Record((1, -10)), Record((2, -20))])
+
+    assert [(row.id, row["amount"]) for row in rows] == [(1, -10), (2, -20)]
+    assert statement._make_rows([]) == []
@@ -0,0 +1,58 @@
+"""Tests of JWT decoding cache."""
+# pylint: disable=missing-function-docstring
+
+import jwt
+import pytest
+
+from app.cache import LocalCache
+from app.utils import jwt as token_utils
+from app.utils.errors import TokenError
+
+SECRET_KEY = "test-secret"
+
+
+@pytest.fixture(name="caches")
+def fixture_caches(monkeypatch):
+    token_cache = LocalCache(maxsize=2, ttl=60)
+    rejected_token_cache = LocalCache(maxsize=2, ttl=60)
+    monkeypatch.setattr(token_utils, "token_cache", token_cache)
+    monkeypatch.setattr(token_utils, "rejected_token_cache", rejected_token_cache)
+    return token_cache, rejected_token_cache
+
+
+def make_token(user_id):
+    token = jwt.encode({"user_id": user_id}, SECRET_KEY)
+    return token.decode() if isinstance(token, bytes) else token
+
+
+def test_verified_payload_is_cached(caches):
+    token_cache, _ = caches
+    token = make_token(1)
+
+    assert token_utils.decode_token(token, SECRET_KEY) == {"user_id": 1}
+    assert token_utils.decode_token(token, SECRET_KEY) == {"user_id": 1}
+    assert (token_cache.hits, token_cache.misses) == (1, 1)
+
+
+def test_rejection_is_cached_with_its_reason(caches):
+    _, rejected_token_cache = caches
+
+    for _ in range(2):
+        with pytest.raises(TokenError, match="invalid"):
+            token_utils.decode_token("bogus", SECRET_KEY)
+
+    assert rejected_token_cache.hits == 1
+
+
+def test_bogus_tokens_do_not_evict_verified_ones(caches):
+    token_cache, rejected_token_cache = caches
+    token = make_token(1)
+    token_utils.decode_token(token, SECRET_KEY)
+
+    for index in range(10):
+        with pytest.raises(TokenError):
+            token_utils.decode_token(f"bogus-{index}", SECRET_KEY)
+
+    assert token_utils.decode_token(token, SECRET_KEY) == {"user_id": 1}
+    assert token_cache.hits == 1
+    assert len(rejected_token_cache) == 2
@@ -0,0 +1,48 @@
+"""Tests of logging helpers."""
+# pylint: disable=missing-function-docstring,protected-access
+
+import logging
+
+from app.utils import log
+from app.utils.log import RateLimitFilter
+
+
+def make_record(msg, *args):
+    return logging.LogRecord("collector", logging.INFO, __file__, 1, msg, args, None)
+
+
+def test_templated_records_are_limited(monkeypatch):
+    now = [0.0]
+    monkeypatch.setattr(log.time, "monotonic", lambda: now[0])
+    log_filter = RateLimitFilter(interval=10, burst=2)
+
+    passed = [log_filter.filter(make_record("user=%s failed", user)) for user in range(5)]
+    assert passed == [True, True, False, False, False]
+
+    now[0] = 10
+    record = make_record("user=%s failed", 6)
+    assert log_filter.filter(record)
+    assert getattr(record, "suppressed") == 3
+    assert "3 similar messages suppressed" in record.getMessage()
+
+
+def test_formatted_records_are_not_tracked():
+    log_filter = RateLimitFilter(interval=10, burst=1)
+    for request in range(1000):
+        assert log_filter.filter(make_record(f"GET /monobank/{request} 200"))
+
+    assert not log_filter._windows
+
+
+def test_windows_are_bounded(monkeypatch):
+    now = [0.0]
+    monkeypatch.setattr(log.time, "monotonic", lambda: now[0])
+    log_filter = RateLimitFilter(interval=10, burst=1, maxsize=3)
+    for template in range(100):
+        log_filter.filter(make_record(f"template {template} %s", 1))
+
+    assert len(log_filter._windows) == 3
+
+    now[0] = 20
+    log_filter.filter(make_record("fresh %s", 1))
+    assert list(log_filter._windows) == [("collector", logging.INFO, "fresh %s")]
@@ -0,0 +1,21 @@
+"""Tests of prometheus metrics rendering."""
+# pylint: disable=missing-function-docstring
+
+from app.cache import LocalCache
+from app.metrics import Registry
+
+
+def test_cache_lookups_are_exported_as_counters():
+    registry = Registry()
+    cache = LocalCache(maxsize=10, ttl=60)
+    cache.set("key", "value")
+    cache.get("key")
+    cache.get("missing")
+    registry.register_cache("test", cache)
+
+    lines = registry.render().splitlines()
+
+    assert "# TYPE collector_cache_hits_total counter" in lines
+    assert 'collector_cache_hits_total{cache="test"} 1' in lines
+    assert 'collector_cache_misses_total{cache="test"} 1' in lines
+    assert "# TYPE collector_cache_hit_ratio gauge" in lines
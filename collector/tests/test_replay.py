@@ -0,0 +1,56 @@
+"""Tests of transaction events replay buffer."""
+# pylint: disable=missing-function-docstring,unused-argument
+
+import asyncio
+import json
+
+import aioredis
+
+from app.cache import TRANSACTION_EVENTS_CACHE_KEY, TRANSACTION_EVENTS_SEQ_CACHE_KEY
+from app.utils.replay import TransactionEvents
+
+
+EVENTS_KEY = TRANSACTION_EVENTS_CACHE_KEY.format(user_id=1)
+SEQ_KEY = TRANSACTION_EVENTS_SEQ_CACHE_KEY.format(user_id=1)
+
+
+def store_events(fake_redis, seqs, latest):
+    # events are pushed to the head of the list, so the newest one goes first
+    fake_redis.data[EVENTS_KEY] = [json.dumps({"seq": seq, "transaction": {"id": seq}}) for seq in reversed(seqs)]
+    fake_redis.data[SEQ_KEY] = str(latest)
+
+
+def get_since(since):
+    return asyncio.run(TransactionEvents(size=3, ttl=60).get_since(1, since))
+
+
+def test_missed_events_are_returned_in_order(fake_redis):
+    store_events(fake_redis, [3, 4, 5], latest=5)
+    events, latest, complete = get_since(3)
+
+    assert [event["seq"] for event in events] == [4, 5]
+    assert (latest, complete) == (5, True)
+
+
+def test_evicted_events_make_replay_incomplete(fake_redis):
+    store_events(fake_redis, [3, 4, 5], latest=5)
+    events, latest, complete = get_since(1)
+
+    assert [event["seq"] for event in events] == [3, 4, 5]
+    assert (latest, complete) == (5, False)
+
+
+def test_up_to_date_or_new_client_gets_nothing(fake_redis):
+    store_events(fake_redis, [3, 4, 5], latest=5)
+
+    assert get_since(5) == ([], 5, True)
+    assert get_since(None) == ([], 5, True)
+
+
+def test_cursor_ahead_of_lost_sequence_is_incomplete(fake_redis):
+    assert get_since(7) == ([], 0, False)
+
+
+def test_redis_error_makes_replay_incomplete(fake_redis):
+    fake_redis.error = aioredis.RedisError("connection lost")
+    assert get_since(3) == ([], None, False)
@@ -0,0 +1,49 @@
+"""Tests of streaming statement dump reading."""
+# pylint: disable=missing-function-docstring
+
+import io
+import json
+
+import pytest
+
+from app.utils import statement
+from app.utils.statement import read_json_array, read_statement_items
+
+
+def make_items(count):
+    return [{"id": f"tx-{index}", "amount": -index, "description": "coffee, [large]"} for index in range(count)]
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 64, 64 * 1024])
+def test_json_array_elements_cut_by_chunks_are_decoded(monkeypatch, chunk_size):
+    monkeypatch.setattr(statement, "READ_CHUNK_SIZE", chunk_size)
+    items = make_items(50)
+    dump = io.StringIO("  \n" + json.dumps(items, indent=2))
+
+    assert list(read_json_array(dump)) == items
+
+
+def test_empty_json_array():
+    assert not list(read_json_array(io.StringIO("[ ]")))
+
+
+def test_json_array_is_required():
+    with pytest.raises(ValueError):
+        list(read_json_array(io.StringIO('{"id": 1}')))
+
+
+def test_truncated_json_array_fails(monkeypatch):
+    monkeypatch.setattr(statement, "READ_CHUNK_SIZE", 8)
+    with pytest.raises(ValueError):
+        list(read_json_array(io.StringIO('[{"id": 1}, {"id": ')))
+
+
+def test_statement_items_are_wrapped_into_webhook_payload():
+    items = make_items(2)
+    payload = {"data": {"account": "a", "statementItem": items[0]}}
+    ndjson = io.StringIO(f"{json.dumps(payload)}\n\n{json.dumps(items[1])}\n")
+
+    assert list(read_statement_items(ndjson)) == [payload, {"data": {"statementItem": items[1]}}]
+    assert list(read_statement_items(io.StringIO(json.dumps(items)))) == [
+        {"data": {"statementItem": item}} for item in items
+    ]
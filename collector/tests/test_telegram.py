@@ -0,0 +1,92 @@
+"""Tests of telegram client rate limiting."""
+# pylint: disable=missing-function-docstring,protected-access,redefined-outer-name,unused-argument
+
+import asyncio
+
+import pytest
+
+from app import config
+from app.utils import telegram
+from app.utils.telegram import TelegramClient
+
+
+class FakeClock:
+    """Monotonic clock that is moved manually."""
+
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Replace monotonic clock used by telegram client."""
+    fake_clock = FakeClock()
+    monkeypatch.setattr(telegram.time, "monotonic", fake_clock)
+    monkeypatch.setattr(config, "TELEGRAM_GLOBAL_RATE", 30)
+    monkeypatch.setattr(config, "TELEGRAM_CHAT_RATE", 1)
+    return fake_clock
+
+
+def test_global_slots_are_spaced_by_global_rate(clock):
+    client = TelegramClient()
+    delays = [client._reserve_slot() for _ in range(3)]
+    assert delays == pytest.approx([0, 1 / 30, 2 / 30])
+
+
+def test_chat_backlog_does_not_delay_other_chats(clock):
+    client = TelegramClient()
+    chat_delays = [client._reserve_chat_slot(chat) for chat in ("a", "a", "b", "c", "d", "e")]
+    assert chat_delays == pytest.approx([0, 1, 0, 0, 0, 0])
+
+    # only messages that are not delayed by chat limit take global slots now
+    global_delays = [client._reserve_slot() for delay in chat_delays if delay == 0]
+    assert global_delays == pytest.approx([0, 1 / 30, 2 / 30, 3 / 30, 4 / 30])
+
+    clock.now += 1
+    assert client._reserve_chat_slot("a") == pytest.approx(1)
+    assert client._reserve_slot() == 0
+
+
+def test_global_slot_respects_pause(clock):
+    client = TelegramClient()
+    client._paused_until = clock.now + 5
+    assert client._reserve_slot() == pytest.approx(5)
+    assert client._reserve_slot() == pytest.approx(5 + 1 / 30)
+    assert client._reserve_chat_slot("a") == 0
+
+
+def test_chat_slots_are_pruned(clock, monkeypatch):
+    monkeypatch.setattr(config, "TELEGRAM_QUEUE_SIZE", 2)
+    client = TelegramClient()
+    for chat in ("a", "b", "c"):
+        client._reserve_chat_slot(chat)
+
+    clock.now += 2
+    client._reserve_chat_slot("d")
+    assert list(client._chat_slots) == ["d"]
+
+
+def test_deferred_message_does_not_hold_workers(clock, monkeypatch):
+    sent = []
+
+    async def fake_send(self, params):
+        sent.append(params["chat_id"])
+        return True
+
+    async def run():
+        client = TelegramClient()
+        monkeypatch.setattr(TelegramClient, "_send", fake_send)
+        monkeypatch.setattr(config, "TELEGRAM_CONCURRENCY", 1)
+        await client.start()
+        client._chat_slots["a"] = clock.now + 60
+        deferred = asyncio.ensure_future(client.send_message("a", "first"))
+        assert await client.send_message("b", "second")
+        assert client.queue_size == 1
+        deferred.cancel()
+        await client.close()
+
+    asyncio.run(run())
+    assert sent == ["b"]